@@ -1,4 +1,7 @@
+import argparse
 import csv
+import time
+import sectionQuery
 
 
 def read_course_data(file_path):
@@ -31,22 +34,69 @@ def filter_classes_by_course_number(course_data, course_number):
 
 
 def main():
-    course_number_input = input("Enter the CSCI course number to check: ")
-    csv_file_path = "JJ_CS-Courses.csv"
+    parser = argparse.ArgumentParser(
+        description="Check the open and closed sections of a course"
+    )
+    parser.add_argument("course_number", nargs="?", help="e.g. 101")
+    parser.add_argument("--subject", default="CSCI", help="e.g. CSCI")
+    parser.add_argument(
+        "--files",
+        nargs="+",
+        help="CSV or JSON snapshot files (default: the newest file of every "
+        "college, term, subject and career)",
+    )
+    parser.add_argument("--college", help="college code, e.g. JJC01")
+    parser.add_argument("--term", help="term code, e.g. 1242")
+    parser.add_argument("--instructor", help="part of the instructor name")
+    parser.add_argument("--mode", help="instruction mode, e.g. Online")
+    parser.add_argument("--days", help="meeting days, e.g. TuTh")
+    parser.add_argument("--after", help="starts at or after, e.g. 5PM")
+    parser.add_argument("--before", help="ends at or before, e.g. 12:00")
+    args = parser.parse_args()
+
+    subject = args.subject
+    course_number_input = args.course_number or input(
+        f"Enter the {subject} course number to check: "
+    )
 
     try:
-        course_data = read_course_data(csv_file_path)
-        open_classes, closed_classes = filter_classes_by_course_number(
-            course_data, course_number_input
+        table = sectionQuery.SectionTable.from_files(
+            args.files or sectionQuery.latest_snapshot_files()
+        )
+        start = time.perf_counter()
+        positions = table.query(
+            subject,
+            course_number_input,
+            college_code=args.college,
+            term=args.term,
+            instructor=args.instructor,
+            mode=args.mode,
+            days=args.days,
+            start_after=sectionQuery.parse_clock(args.after) if args.after else None,
+            end_before=sectionQuery.parse_clock(args.before) if args.before else None,
         )
+        elapsed = time.perf_counter() - start
+        classes = table.rows(positions)
+        open_classes = [cls for cls in classes if cls["status"] == "open"]
+        closed_classes = [cls for cls in classes if cls["status"] == "closed"]
 
-        print(f"Open classes for CSCI {course_number_input}:")
+        print(f"Open classes for {subject} {course_number_input}:")
         for cls in open_classes:
-            print(f"  Class: {cls['Class']}, Section: {cls['Section']}")
+            print(
+                f"  {cls['college_code']} Class: {cls['class']}, "
+                f"Section: {cls['section']}"
+            )
 
-        print(f"\nClosed classes for CSCI {course_number_input}:")
+        print(f"\nClosed classes for {subject} {course_number_input}:")
         for cls in closed_classes:
-            print(f"  Class: {cls['Class']}, Section: {cls['Section']}")
+            print(
+                f"  {cls['college_code']} Class: {cls['class']}, "
+                f"Section: {cls['section']}"
+            )
+        print(
+            f"\n{len(classes)} of {table.size} sections matched "
+            f"in {elapsed * 1000:.3f} ms"
+        )
     except FileNotFoundError:
         print("Error: The specified CSV file could not be found.")
     except Exception as e:
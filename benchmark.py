@@ -0,0 +1,309 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+import ClassStatus
+import courseParser
+import courseWriter
+import officalScrap
+import sectionQuery
+import syntheticPages
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+BENCHMARK_ROOT = "benchmarks"
+PAGES_ROOT = os.path.join(BENCHMARK_ROOT, "pages")
+BASELINE_FILE = os.path.join(BENCHMARK_ROOT, "baseline.json")
+SIZES = [10, 100, 1000]
+HISTORY_SNAPSHOTS = 24
+# A case regresses when its fastest sample is this much slower than the
+# baseline's and at least MIN_REGRESSION_MS slower. The minimum is compared
+# because it is the sample least disturbed by other load on the machine.
+TOLERANCE = 0.3
+MIN_REGRESSION_MS = 0.25
+SAMPLE_SECONDS = 0.05
+
+
+def page_file(sections):
+    return os.path.join(PAGES_ROOT, f"recorded-{sections}.html")
+
+
+def load_pages():
+    """
+    Returns {(kind, sections): html}. Recorded pages ship with the repo;
+    synthetic pages are generated from a fixed seed, so they never change.
+    """
+    pages = {}
+    for sections in SIZES:
+        with open(page_file(sections), "r", encoding="utf-8") as file:
+            pages[("recorded", sections)] = file.read()
+        pages[("synthetic", sections)] = syntheticPages.render_results_html(
+            syntheticPages.synthetic_courses(sections, seed=sections)
+        )
+    return pages
+
+
+def write_pages():
+    # Regenerates the recorded pages from the saved scrapes in collegeCourseData
+    os.makedirs(PAGES_ROOT, exist_ok=True)
+    for sections in SIZES:
+        courses = syntheticPages.recorded_courses(sections)
+        with courseWriter.atomic_open(page_file(sections)) as file:
+            file.write(syntheticPages.render_results_html(courses))
+        logging.info(f"Wrote {page_file(sections)}")
+
+
+def measure(function, repeat):
+    """
+    Times function() `repeat` times after one warm-up call. Fast functions
+    run in loops of at least SAMPLE_SECONDS so the timer resolution does not
+    matter. Returns the per-call times in milliseconds.
+    """
+    start = time.perf_counter()
+    function()
+    single = time.perf_counter() - start
+    loops = max(1, math.ceil(SAMPLE_SECONDS / single)) if single else 1000
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        samples.append((time.perf_counter() - start) / loops * 1000)
+    return samples
+
+
+def build_cases(pages, work_directory, loop):
+    """
+    Returns [(name, function)] covering parsing, serialization, loading and
+    querying. Files are written below work_directory; the async save cases
+    run on loop.
+    """
+    cases = []
+
+    for (kind, sections), html_content in pages.items():
+        for backend_name in courseParser.available_backends():
+            backend = courseParser.get_backend(backend_name)
+            cases.append(
+                (
+                    f"parse[{backend_name}]/{kind}/{sections}",
+                    lambda html_content=html_content, backend=backend: (
+                        courseParser.parse_course_results(html_content, backend)
+                    ),
+                )
+            )
+
+    for sections in SIZES:
+        html_content = pages[("recorded", sections)]
+        data = courseParser.parse_course_results(html_content)
+        arguments = ("Bench", "BEN01", "1242", "SUBJ", "UGRD", f"size{sections}")
+        csv_file = officalScrap.generate_file_name(
+            "collegeCourseData", "csvFiles", *arguments, "csv"
+        )
+
+        cases.append(
+            (
+                f"save json/{sections}",
+                lambda data=data, arguments=arguments: loop.run_until_complete(
+                    officalScrap.save_data_to_json(data, *arguments)
+                ),
+            )
+        )
+        cases.append(
+            (
+                f"save csv/{sections}",
+                lambda data=data, arguments=arguments: loop.run_until_complete(
+                    officalScrap.save_data_to_csv(data, *arguments)
+                ),
+            )
+        )
+        cases.append(
+            (
+                f"stream csv+jsonl/{sections}",
+                lambda html_content=html_content, sections=sections: (
+                    courseWriter.write_course_records(
+                        courseParser.iter_course_results(html_content),
+                        f"stream-{sections}.csv",
+                        f"stream-{sections}.jsonl",
+                    )
+                ),
+            )
+        )
+
+        # The loading and query cases read the file written above
+        loop.run_until_complete(officalScrap.save_data_to_csv(data, *arguments))
+        rows = ClassStatus.read_course_data(csv_file)
+        course_number = rows[len(rows) // 2]["Course Name"].split()[1]
+        cases.append(
+            (
+                f"load csv/{sections}",
+                lambda csv_file=csv_file: ClassStatus.read_course_data(csv_file),
+            )
+        )
+        cases.append(
+            (
+                f"filter/{sections}",
+                lambda rows=rows, course_number=course_number: (
+                    ClassStatus.filter_classes_by_course_number(rows, course_number)
+                ),
+            )
+        )
+
+    history_root = os.path.join(work_directory, "history")
+    history_files = syntheticPages.write_csv_history(
+        history_root, 1000, HISTORY_SNAPSHOTS
+    )
+    table = sectionQuery.SectionTable.from_files(history_files)
+    sample = table.row(table.size // 2)
+    cases.append(
+        (
+            f"load history/{HISTORY_SNAPSHOTS}x1000",
+            lambda: sectionQuery.SectionTable.from_files(history_files),
+        )
+    )
+    cases.append(
+        (
+            f"latest files/{HISTORY_SNAPSHOTS}x1000",
+            lambda: sectionQuery.latest_snapshot_files(history_root),
+        )
+    )
+    cases.append(
+        (
+            f"query index/{HISTORY_SNAPSHOTS}x1000",
+            lambda: table.query(sample["subject"], sample["course_number"], "open"),
+        )
+    )
+    cases.append(
+        (
+            f"query scan/{HISTORY_SNAPSHOTS}x1000",
+            lambda: table.query(instructor="instructor 01", days="TuTh"),
+        )
+    )
+    return cases
+
+
+def run(repeat=9, only=None, names=None):
+    """
+    Runs every case (or those whose name contains `only`, or is in `names`)
+    in a scratch directory. Returns {name: {"median_ms", "min_ms", "stdev_ms"}}.
+    """
+    pages = load_pages()
+    work_directory = tempfile.mkdtemp(prefix="benchmark-")
+    results = {}
+    previous_directory = os.getcwd()
+    # One loop for every save case, so its setup is not part of the timings
+    loop = asyncio.new_event_loop()
+    logging.disable(logging.INFO)
+    try:
+        os.chdir(work_directory)
+        for name, function in build_cases(pages, work_directory, loop):
+            if (only and only not in name) or (names and name not in names):
+                continue
+            samples = measure(function, repeat)
+            results[name] = {
+                "median_ms": statistics.median(samples),
+                "min_ms": min(samples),
+                "stdev_ms": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+            }
+    finally:
+        loop.close()
+        os.chdir(previous_directory)
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(work_directory, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    # Returns [(name, min_ms, baseline_min_ms)] of the cases that got slower
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        limit = max(
+            expected["min_ms"] * (1 + tolerance),
+            expected["min_ms"] + MIN_REGRESSION_MS,
+        )
+        if result["min_ms"] > limit:
+            regressions.append((name, result["min_ms"], expected["min_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline scraper benchmarks")
+    parser.add_argument("--repeat", type=int, default=9, help="samples per case")
+    parser.add_argument("--only", help="run the cases whose name contains this")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=TOLERANCE,
+        help="allowed slowdown of the fastest sample, e.g. 0.3 for 30%%",
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store this run as the baseline"
+    )
+    parser.add_argument(
+        "--write-pages",
+        action="store_true",
+        help="regenerate the recorded pages from collegeCourseData first",
+    )
+    args = parser.parse_args()
+
+    if args.write_pages:
+        write_pages()
+
+    results = run(args.repeat, args.only)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+
+    print(f"{'case':<40} {'median ms':>10} {'min ms':>10} {'base min':>10}")
+    for name, result in results.items():
+        expected = baseline.get(name, {}).get("min_ms")
+        print(
+            f"{name:<40} {result['median_ms']:>10.3f} {result['min_ms']:>10.3f} "
+            f"{expected if expected is not None else float('nan'):>10.3f}"
+        )
+
+    if args.save_baseline:
+        merged = dict(baseline, **results)
+        with courseWriter.atomic_open(args.baseline) as file:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "results": merged,
+                },
+                file,
+                indent=4,
+                sort_keys=True,
+            )
+        logging.info(f"Baseline has been saved: {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        # Measure the suspects once more so a noisy moment does not fail the run
+        retried = run(args.repeat, names={name for name, _, _ in regressions})
+        regressions = compare(retried, baseline, args.tolerance)
+    for name, fastest, expected in regressions:
+        logging.error(f"Regression in {name}: {fastest:.3f} ms vs {expected:.3f} ms")
+    if regressions:
+        raise SystemExit(1)
+    logging.info(f"No regressions in {len(results)} cases")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+from playwright.async_api import async_playwright
+import argparse
+import asyncio
+import json
+import logging
+import metrics
+import officalScrap
+import requestFilter
+import resultCache
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class ContextPool:
+    """
+    Keeps a fixed number of browser contexts open in one warm browser. A
+    context is closed and replaced after `max_uses` scrapes to keep memory
+    bounded, and with `warm=True` each idle page already sits on search.jsp.
+    With `reuse_forms=True` a page stays on its results instead, so the next
+    scrape of the same college and term only switches subject and career.
+    """
+
+    def __init__(self, browser, size=2, max_uses=25, warm=False, reuse_forms=False):
+        self.browser = browser
+        self.max_uses = max_uses
+        self.warm = warm
+        self.reuse_forms = reuse_forms
+        self.slots = asyncio.Queue()
+        self.resets = set()
+        for _ in range(size):
+            self.slots.put_nowait(
+                {"context": None, "page": None, "session": None, "uses": 0}
+            )
+
+    async def open_slot(self, slot):
+        slot["context"] = await requestFilter.new_context(self.browser)
+        slot["page"] = await slot["context"].new_page()
+        slot["session"] = officalScrap.SearchSession(slot["page"])
+        slot["uses"] = 0
+        if self.warm:
+            await slot["page"].goto(officalScrap.SEARCH_URL)
+
+    async def close_slot(self, slot):
+        if slot["context"]:
+            await slot["context"].close()
+        slot["context"] = None
+        slot["page"] = None
+        slot["session"] = None
+
+    async def acquire(self):
+        slot = await self.slots.get()
+        try:
+            if slot["context"] is None:
+                await self.open_slot(slot)
+        except Exception:
+            self.slots.put_nowait(slot)
+            raise
+        return slot
+
+    async def release(self, slot, failed=False):
+        try:
+            slot["uses"] += 1
+            if failed or slot["uses"] >= self.max_uses:
+                # Recycle the context; the next acquire opens a fresh one
+                await self.close_slot(slot)
+            elif self.warm and not (self.reuse_forms and slot["session"].selection):
+                await slot["page"].goto(officalScrap.SEARCH_URL)
+        except Exception as e:
+            logging.error(f"Could not reset browser context: {e}")
+            await self.close_slot(slot)
+        finally:
+            self.slots.put_nowait(slot)
+
+    async def scrape(self, target, save=True, max_age=None):
+        slot = await self.acquire()
+        failed = True
+        try:
+            if self.reuse_forms:
+                courses = await slot["session"].scrape(target, save, max_age)
+            else:
+                courses = await officalScrap.scrape_target(
+                    slot["page"], target, save, max_age
+                )
+            failed = False
+            return courses
+        finally:
+            # Reset the page in the background so the caller gets its answer now
+            task = asyncio.create_task(self.release(slot, failed))
+            self.resets.add(task)
+            task.add_done_callback(self.resets.discard)
+
+    async def close(self):
+        await asyncio.gather(*self.resets, return_exceptions=True)
+        while not self.slots.empty():
+            await self.close_slot(self.slots.get_nowait())
+
+
+async def handle_client(pool, reader, writer):
+    # One JSON request per line, answered with one JSON line
+    try:
+        while line := await reader.readline():
+            try:
+                request = json.loads(line)
+                if request.get("stats"):
+                    cache = resultCache.shared
+                    stats = cache.stats() if cache else None
+                    response = {"stats": stats, "error": None}
+                else:
+                    # A client's max_age does not turn on a cache served off
+                    max_age = request.get("max_age") if resultCache.shared else None
+                    courses = await pool.scrape(
+                        request["target"], request.get("save", True), max_age
+                    )
+                    response = {"courses": courses, "error": None}
+            except Exception as e:
+                logging.error(f"An error occurred: {e}")
+                response = {"courses": None, "error": str(e)}
+            writer.write((json.dumps(response) + "\n").encode("utf-8"))
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(
+    host=DEFAULT_HOST,
+    port=DEFAULT_PORT,
+    contexts=2,
+    max_uses=25,
+    warm=True,
+    reuse_forms=False,
+    cache_age=resultCache.MAX_AGE,
+    cache_size=resultCache.MAX_ENTRIES,
+):
+    # Identical requests within cache_age seconds share one fetch; 0 turns it off
+    resultCache.configure(cache_age, cache_size)
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        pool = ContextPool(browser, contexts, max_uses, warm, reuse_forms)
+        server = await asyncio.start_server(
+            lambda reader, writer: handle_client(pool, reader, writer),
+            host,
+            port,
+        )
+        logging.info(f"Browser daemon listening on {host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await pool.close()
+            await officalScrap.catalog.wait_for_refreshes()
+            await browser.close()
+            if requestFilter.LEAN:
+                logging.info(requestFilter.stats.summary())
+            if resultCache.shared:
+                logging.info(f"Result cache: {resultCache.shared.stats()}")
+
+
+async def send_request(request, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write((json.dumps(request) + "\n").encode("utf-8"))
+        await writer.drain()
+        response = json.loads(await reader.readline())
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+    if response["error"]:
+        raise RuntimeError(response["error"])
+    return response
+
+
+async def request_scrape(
+    target, save=True, host=DEFAULT_HOST, port=DEFAULT_PORT, max_age=None
+):
+    """
+    Sends one scrape to a running daemon and returns its courses. max_age
+    overrides how old a cached result may be, in seconds (0 forces a scrape).
+    """
+    request = {"target": target, "save": save}
+    if max_age is not None:
+        request["max_age"] = max_age
+    return (await send_request(request, host, port))["courses"]
+
+
+async def request_stats(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    # Hit/miss counts of the daemon's result cache, or None when it is off
+    return (await send_request({"stats": True}, host, port))["stats"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm browser scrape daemon")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="start the daemon")
+    serve_parser.add_argument("--contexts", type=int, default=2)
+    serve_parser.add_argument(
+        "--max-uses", type=int, default=25, help="scrapes before a context is recycled"
+    )
+    serve_parser.add_argument(
+        "--cold", action="store_true", help="do not keep pages on search.jsp"
+    )
+    serve_parser.add_argument(
+        "--cache-age",
+        type=float,
+        default=resultCache.MAX_AGE,
+        help="seconds a result is reused for identical requests (0 turns it off)",
+    )
+    serve_parser.add_argument("--cache-size", type=int, default=resultCache.MAX_ENTRIES)
+    serve_parser.add_argument(
+        "--reuse-forms",
+        action="store_true",
+        help="keep pages on their results and switch only subject/career",
+    )
+
+    serve_parser.add_argument(
+        "--base-url", help="search tool to scrape, e.g. a local mockServer.py"
+    )
+    metrics.add_arguments(serve_parser)
+
+    scrape_parser = commands.add_parser("scrape", help="send a scrape to the daemon")
+    scrape_parser.add_argument("college_code")
+    scrape_parser.add_argument("term")
+    scrape_parser.add_argument("subject")
+    scrape_parser.add_argument("career")
+    scrape_parser.add_argument(
+        "--max-age", type=float, help="oldest cached result to accept, in seconds"
+    )
+
+    commands.add_parser("stats", help="show the daemon's result cache stats")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        metrics.configure_from_args(args)
+        if args.base_url:
+            officalScrap.set_base_url(args.base_url)
+        asyncio.run(
+            serve(
+                args.host,
+                args.port,
+                args.contexts,
+                args.max_uses,
+                not args.cold,
+                args.reuse_forms,
+                args.cache_age,
+                args.cache_size,
+            )
+        )
+    elif args.command == "stats":
+        print(json.dumps(asyncio.run(request_stats(args.host, args.port)), indent=4))
+    else:
+        target = [args.college_code, args.term, args.subject, args.career]
+        courses = asyncio.run(
+            request_scrape(target, True, args.host, args.port, args.max_age)
+        )
+        logging.info(f"Received {len(courses)} courses")
+
+
+if __name__ == "__main__":
+    main()
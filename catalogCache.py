@@ -0,0 +1,169 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import courseWriter
+import preferences
+import requestFilter
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+CATALOG_ROOT = "CollegeDataList"
+COLLEGE_FILE = os.path.join(CATALOG_ROOT, "collegeNTerm_data.json")
+SUBJECT_FILE_NAME = "subjectNCareer_data.json"
+
+DAY = 24 * 60 * 60
+# How long each entry counts as fresh. Stale entries are still served and
+# refreshed in the background; nothing is ever deleted on the hot path.
+TTLS = {
+    "CollegeList": 30 * DAY,
+    "CollegeCodes": 30 * DAY,
+    "TermList": DAY,
+    "SubjectList": 7 * DAY,
+    "CareerList": 30 * DAY,
+}
+DEFAULT_TTL = 7 * DAY
+
+
+def load_json(file_name):
+    with open(file_name, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def subject_file(collegeName):
+    return os.path.join(CATALOG_ROOT, collegeName, SUBJECT_FILE_NAME)
+
+
+class CatalogCache:
+    """
+    Colleges, terms, subjects and careers with a fetch time per entry. The
+    files keep their existing layout plus a "fetched" map of timestamps.
+    """
+
+    def __init__(self, ttls=None):
+        self.ttls = dict(TTLS, **(ttls or {}))
+        self.files = {}
+        self.refreshing = {}
+
+    async def load(self, file_name):
+        if file_name not in self.files:
+            data = await preferences.load_data(file_name) or {}
+            # Entries saved before timestamps were kept take the file's mtime
+            fetched = data.setdefault("fetched", {})
+            for key in data:
+                if key != "fetched":
+                    fetched.setdefault(key, os.path.getmtime(file_name))
+            self.files[file_name] = data
+        return self.files[file_name]
+
+    async def get(self, file_name, key):
+        """
+        Returns (value, fresh). value is None when the entry was never fetched.
+        """
+        data = await self.load(file_name)
+        if key not in data:
+            return None, False
+        age = time.time() - data["fetched"].get(key, 0)
+        return data[key], age <= self.ttls.get(key, DEFAULT_TTL)
+
+    def put(self, file_name, **entries):
+        data = self.files.setdefault(file_name, {"fetched": {}})
+        now = time.time()
+        for key, value in entries.items():
+            data[key] = value
+            data["fetched"][key] = now
+
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        with courseWriter.atomic_open(file_name) as file:
+            json.dump(data, file, indent=4)
+
+    def refresh_in_background(self, file_name, refresh):
+        """
+        Starts refresh() (a coroutine function returning the new entries)
+        unless a refresh of this file is already running.
+        """
+        if file_name in self.refreshing:
+            return
+
+        async def run_refresh():
+            try:
+                self.put(file_name, **await refresh())
+                logging.info(f"Catalog has been refreshed: {file_name}")
+            except Exception as e:
+                logging.error(f"Catalog refresh failed for {file_name}: {e}")
+            finally:
+                self.refreshing.pop(file_name, None)
+
+        self.refreshing[file_name] = asyncio.create_task(run_refresh())
+
+    async def wait_for_refreshes(self):
+        await asyncio.gather(*self.refreshing.values(), return_exceptions=True)
+
+
+async def read_options(page, selector):
+    # One round trip for the whole list instead of two calls per option
+    return await page.eval_on_selector_all(
+        f"{selector} option",
+        "options => options.filter(o => o.value)"
+        ".map(o => [o.textContent.trim(), o.value])",
+    )
+
+
+async def scrape_college_catalog(page):
+    """
+    Reads college names, college codes and terms from a page on search.jsp.
+    """
+    colleges = await page.eval_on_selector_all(
+        "ul.checkboxes input[type='checkbox']",
+        "boxes => boxes.map(box => {"
+        " const label = document.querySelector(`label[for='${box.id}']`);"
+        " return [box.id, (label || box).textContent.trim()]; })",
+    )
+    return {
+        "CollegeList": [name for _, name in colleges],
+        "CollegeCodes": [code for code, _ in colleges],
+        "TermList": await read_options(page, "select[name='term_value']"),
+    }
+
+
+async def scrape_subject_catalog(page):
+    """
+    Reads subjects and careers from a page on the subject/career form.
+    """
+    return {
+        "SubjectList": await read_options(page, "#subject_ld"),
+        "CareerList": await read_options(page, "#courseCareerId"),
+    }
+
+
+async def refresh_college_catalog(browser, search_url):
+    # A separate context, so the scrape's own search session is untouched
+    context = await requestFilter.new_context(browser)
+    try:
+        page = await context.new_page()
+        await page.goto(search_url)
+        return await scrape_college_catalog(page)
+    finally:
+        await context.close()
+
+
+async def refresh_subject_catalog(browser, search_url, college_code, term):
+    context = await requestFilter.new_context(browser)
+    try:
+        page = await context.new_page()
+        await page.goto(search_url)
+        await page.click(f"label[for='{college_code}']")
+        await page.select_option("select[name='term_value']", term)
+        await page.get_by_role("button", name="Next").click()
+        await page.wait_for_selector("#subject_ld")
+        return await scrape_subject_catalog(page)
+    finally:
+        await context.close()
+
+
+catalog = CatalogCache()
@@ -0,0 +1,263 @@
+from playwright.async_api import async_playwright
+from urllib.parse import urlparse
+import aiohttp
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import browserDaemon
+import catalogCache
+import httpScrap
+import metrics
+import officalScrap
+import requestFilter
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+CHECKPOINT_FILE = os.path.join("collegeCourseData", "crawl_checkpoint.jsonl")
+
+
+def target_key(target):
+    return "_".join(
+        [target["collegeCode"], target["term"], target["subject"], target["career"]]
+    )
+
+
+def enumerate_targets(college_codes=None, terms=None, careers=None):
+    """
+    Builds every (college, term, subject, career) target from the cached
+    catalog files. Colleges without a cached subject list are skipped.
+    """
+    collegeNTermData = (
+        catalogCache.load_json(catalogCache.COLLEGE_FILE)
+        if os.path.exists(catalogCache.COLLEGE_FILE)
+        else {}
+    )
+    college_names = collegeNTermData.get("CollegeList", [])
+    codes = collegeNTermData.get("CollegeCodes", [])
+    all_terms = [value for _, value in collegeNTermData.get("TermList", [])]
+    if not codes:
+        raise ValueError(
+            "No college codes cached yet; run one scrape first to fill "
+            f"{catalogCache.COLLEGE_FILE}."
+        )
+
+    targets = []
+    for name, code in zip(college_names, codes):
+        if college_codes and code not in college_codes:
+            continue
+        collegeName = "".join(name.split())
+        subject_file = catalogCache.subject_file(collegeName)
+        if not os.path.exists(subject_file):
+            logging.warning(f"No cached subjects for {collegeName}, skipping it.")
+            continue
+
+        subjectNCareerData = catalogCache.load_json(subject_file)
+        for term in terms or all_terms:
+            for _, subject in subjectNCareerData.get("SubjectList", []):
+                for _, career in subjectNCareerData.get("CareerList", []):
+                    if careers and career not in careers:
+                        continue
+                    targets.append(
+                        {
+                            "collegeName": collegeName,
+                            "collegeCode": code,
+                            "term": term,
+                            "subject": subject,
+                            "career": career,
+                        }
+                    )
+    return targets
+
+
+class HostRateLimiter:
+    """
+    Token bucket per host: at most `rate` scrapes start per second on each
+    host, with bursts of up to `burst`.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, host):
+        while True:
+            async with self.lock:
+                tokens, updated = self.buckets.get(host, (self.burst, time.monotonic()))
+                now = time.monotonic()
+                tokens = min(self.burst, tokens + (now - updated) * self.rate)
+                if tokens >= 1:
+                    self.buckets[host] = (tokens - 1, now)
+                    return
+                self.buckets[host] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            await asyncio.sleep(wait)
+
+
+class Checkpoint:
+    """
+    Append-only log of finished and failed targets, one JSON line each, so
+    an interrupted crawl resumes where it stopped.
+    """
+
+    def __init__(self, file_name=CHECKPOINT_FILE):
+        self.file_name = file_name
+        self.done = set()
+        self.failed = {}
+        if os.path.exists(file_name):
+            with open(file_name, "r", encoding="utf-8") as file:
+                for line in file:
+                    entry = json.loads(line)
+                    self.record(entry["key"], entry["error"])
+
+    def record(self, key, error):
+        if error is None:
+            self.done.add(key)
+            self.failed.pop(key, None)
+        else:
+            self.failed[key] = error
+
+    def mark(self, key, error=None):
+        self.record(key, error)
+        os.makedirs(os.path.dirname(self.file_name) or ".", exist_ok=True)
+        with open(self.file_name, "a", encoding="utf-8") as file:
+            file.write(json.dumps({"key": key, "error": error}) + "\n")
+
+
+async def crawl(
+    targets,
+    engine="browser",
+    concurrency=4,
+    rate=2.0,
+    checkpoint_file=CHECKPOINT_FILE,
+    retry_failed=False,
+    base_url=None,
+):
+    checkpoint = Checkpoint(checkpoint_file)
+    pending = [
+        target
+        for target in targets
+        if target_key(target) not in checkpoint.done
+        and (retry_failed or target_key(target) not in checkpoint.failed)
+    ]
+    logging.info(
+        f"{len(targets)} targets, {len(targets) - len(pending)} already crawled, "
+        f"{len(pending)} to go"
+    )
+
+    queue = asyncio.Queue()
+    for target in pending:
+        queue.put_nowait(target)
+    limiter = HostRateLimiter(rate, burst=concurrency)
+    host = urlparse(base_url or officalScrap.BASE_URL).netloc
+    stats = {"done": 0, "failed": 0, "start": time.monotonic()}
+
+    def report():
+        minutes = (time.monotonic() - stats["start"]) / 60
+        finished = stats["done"] + stats["failed"]
+        logging.info(
+            f"{finished}/{len(pending)} subjects ({stats['failed']} failed), "
+            f"{finished / minutes if minutes else 0:.1f} subjects/min"
+        )
+
+    async def worker(scrape):
+        while True:
+            try:
+                target = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await limiter.acquire(host)
+            try:
+                await scrape(target)
+                checkpoint.mark(target_key(target))
+                stats["done"] += 1
+            except Exception as e:
+                logging.error(f"An error occurred for {target_key(target)}: {e}")
+                checkpoint.mark(target_key(target), str(e))
+                stats["failed"] += 1
+            if (stats["done"] + stats["failed"]) % 10 == 0:
+                report()
+
+    workers = max(1, min(concurrency, len(pending)))
+    if engine == "http":
+        connector = aiohttp.TCPConnector(limit=concurrency)
+
+        async def http_worker():
+            async with aiohttp.ClientSession(
+                connector=connector,
+                connector_owner=False,
+                cookie_jar=aiohttp.CookieJar(unsafe=True),
+            ) as session:
+                await worker(httpScrap.SearchSession(session, base_url).scrape)
+
+        try:
+            await asyncio.gather(*(http_worker() for _ in range(workers)))
+        finally:
+            await connector.close()
+    else:
+        async with async_playwright() as playwright:
+            browser = await playwright.chromium.launch(headless=True)
+            pool = browserDaemon.ContextPool(
+                browser, workers, warm=True, reuse_forms=True
+            )
+            try:
+                await asyncio.gather(*(worker(pool.scrape) for _ in range(workers)))
+            finally:
+                await pool.close()
+                await officalScrap.catalog.wait_for_refreshes()
+                await browser.close()
+                if requestFilter.LEAN:
+                    logging.info(requestFilter.stats.summary())
+
+    report()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Crawl every subject of every college and term"
+    )
+    parser.add_argument("--college", nargs="+", help="college codes, e.g. HTR01")
+    parser.add_argument("--term", nargs="+", help="term codes, e.g. 1242")
+    parser.add_argument("--career", nargs="+", help="career codes, e.g. UGRD")
+    parser.add_argument("--engine", choices=["browser", "http"], default="browser")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--rate", type=float, default=2.0, help="scrapes started per second"
+    )
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    parser.add_argument(
+        "--retry-failed", action="store_true", help="crawl failed targets again"
+    )
+    parser.add_argument(
+        "--base-url", help="search tool to scrape, e.g. a local mockServer.py"
+    )
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+    if args.base_url:
+        officalScrap.set_base_url(args.base_url)
+
+    targets = enumerate_targets(args.college, args.term, args.career)
+    asyncio.run(
+        crawl(
+            targets,
+            args.engine,
+            args.concurrency,
+            args.rate,
+            args.checkpoint,
+            args.retry_failed,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,358 @@
-import os
-import glob
-import shutil
+import argparse
 import datetime
+import glob
+import json
+import logging
+import os
+import zipfile
+import courseWriter
+import sectionQuery
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+# Folders of the live snapshots, one sub-folder per college
+LIVE_ROOTS = [sectionQuery.CSV_ROOT, sectionQuery.JSON_ROOT]
+ARCHIVE_ROOT = os.path.join("collegeCourseData", "archive")
+MANIFEST_FILE = os.path.join(ARCHIVE_ROOT, "manifest.json")
+TIMESTAMP_FORMATS = ["%Y%m%d-%H%M%S", "%Y%m%d"]
+
+
+class RetentionPolicy:
+    """
+    What to keep of each college/term/subject/career series:
+
+    - the newest `keep_last` snapshots, and any younger than `min_age`
+      seconds, stay as plain files;
+    - of the older ones, the newest per hour for the last `hourly` hours and
+      the newest per day for the last `daily` days go into the series
+      archive; the rest are deleted;
+    - `max_bytes` caps each college, dropping its oldest archived snapshots
+      first.
+    """
+
+    def __init__(self, keep_last=1, min_age=900, hourly=24, daily=30, max_bytes=None):
+        self.keep_last = keep_last
+        self.min_age = min_age
+        self.hourly = hourly
+        self.daily = daily
+        self.max_bytes = max_bytes
+
+
+def parse_timestamp(timestamp):
+    for timestamp_format in TIMESTAMP_FORMATS:
+        try:
+            return datetime.datetime.strptime(timestamp, timestamp_format)
+        except ValueError:
+            continue
+    raise ValueError(f"Unknown timestamp: {timestamp}")
+
+
+def series_name(info):
+    # "<College>/<code>_<term>_<subject>_<career>", also the archive's path
+    return (
+        f"{info['college']}/{info['code']}_{info['term']}_"
+        f"{info['subject']}_{info['career']}"
+    )
+
+
+def archive_file(series, root=ARCHIVE_ROOT):
+    return os.path.join(root, *series.split("/")) + ".zip"
+
+
+def load_manifest(manifest_file=MANIFEST_FILE):
+    """
+    Returns {series: {timestamp: {"files": {name: bytes}, "archived": bool}}}.
+    Only archived snapshots are trusted from the manifest; live ones are
+    scanned again on every run.
+    """
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as file:
+            return json.load(file)["series"]
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(manifest, manifest_file=MANIFEST_FILE):
+    os.makedirs(os.path.dirname(manifest_file), exist_ok=True)
+    with courseWriter.atomic_open(manifest_file) as file:
+        json.dump({"version": 1, "series": manifest}, file, sort_keys=True)
+
+
+def scan_live(roots=LIVE_ROOTS):
+    # Returns {series: {timestamp: {name: path}}} of the plain snapshot files
+    live = {}
+    for root in roots:
+        for file_path in glob.glob(os.path.join(root, "*", "*")):
+            try:
+                info = sectionQuery.parse_file_name(file_path)
+            except ValueError:
+                continue
+            snapshots = live.setdefault(series_name(info), {})
+            snapshots.setdefault(info["timestamp"], {})[
+                os.path.basename(file_path)
+            ] = file_path
+    return live
+
+
+def build_index(manifest, live):
+    """
+    Merges the archived entries of the manifest with the live files into
+    {series: {timestamp: entry}}. Live entries also carry their "paths".
+    """
+    index = {}
+    for series, snapshots in manifest.items():
+        for timestamp, entry in snapshots.items():
+            if entry["archived"]:
+                index.setdefault(series, {})[timestamp] = dict(entry)
+    for series, snapshots in live.items():
+        for timestamp, paths in snapshots.items():
+            entry = index.setdefault(series, {}).get(timestamp)
+            if entry is not None:
+                # Archived but not yet deleted when the last run stopped
+                entry["paths"] = paths
+                continue
+            index[series][timestamp] = {
+                "files": {name: os.path.getsize(path) for name, path in paths.items()},
+                "archived": False,
+                "paths": paths,
+            }
+    return index
+
+
+def plan_series(snapshots, policy, now):
+    """
+    Returns {timestamp: "live" | "archive" | "delete"} for one series.
+    """
+    actions = {}
+    hours = set()
+    days = set()
+    for position, timestamp in enumerate(sorted(snapshots, reverse=True)):
+        taken = parse_timestamp(timestamp)
+        age = (now - taken).total_seconds()
+        if position < policy.keep_last or age < policy.min_age:
+            actions[timestamp] = "live"
+        elif age < policy.hourly * 3600 and taken.strftime("%Y%m%d%H") not in hours:
+            hours.add(taken.strftime("%Y%m%d%H"))
+            actions[timestamp] = "archive"
+        elif age < policy.daily * 86400 and taken.date() not in days:
+            days.add(taken.date())
+            actions[timestamp] = "archive"
+        else:
+            actions[timestamp] = "delete"
+        if actions[timestamp] != "delete":
+            hours.add(taken.strftime("%Y%m%d%H"))
+            days.add(taken.date())
+    return actions
+
+
+def plan(index, policy, now=None):
+    """
+    Returns {series: {timestamp: action}} for every series in the index,
+    trimming each college to policy.max_bytes.
+    """
+    now = now or datetime.datetime.now()
+    actions = {
+        series: plan_series(snapshots, policy, now)
+        for series, snapshots in index.items()
+    }
+    if policy.max_bytes is None:
+        return actions
+
+    colleges = {}
+    for series in index:
+        colleges.setdefault(series.split("/")[0], []).append(series)
+    for college, series_list in colleges.items():
+        kept = []
+        total = 0
+        for series in series_list:
+            for timestamp, action in actions[series].items():
+                if action == "delete":
+                    continue
+                size = sum(index[series][timestamp]["files"].values())
+                total += size
+                if action == "archive":
+                    kept.append((timestamp, series, size))
+        for timestamp, series, size in sorted(kept):
+            if total <= policy.max_bytes:
+                break
+            actions[series][timestamp] = "delete"
+            total -= size
+        if total > policy.max_bytes:
+            logging.warning(
+                f"{college} is still over {policy.max_bytes} bytes with only "
+                f"live snapshots left"
+            )
+    return actions
+
+
+def add_to_archive(series, entries, root=ARCHIVE_ROOT):
+    """
+    Appends the files of the live entries to the series archive and records
+    their compressed sizes in the entries.
+    """
+    file_name = archive_file(series, root)
+    os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    with zipfile.ZipFile(file_name, "a", zipfile.ZIP_DEFLATED) as archive:
+        present = set(archive.namelist())
+        for entry in entries:
+            for name, path in entry["paths"].items():
+                if name not in present:
+                    archive.write(path, name)
+            entry["files"] = {
+                name: archive.getinfo(name).compress_size for name in entry["paths"]
+            }
+
+
+def drop_from_archive(series, names, root=ARCHIVE_ROOT):
+    # Zip members cannot be removed in place, so the archive is rewritten
+    file_name = archive_file(series, root)
+    if not os.path.exists(file_name):
+        return
+    temp_name = file_name + ".tmp"
+    with zipfile.ZipFile(file_name) as source, zipfile.ZipFile(
+        temp_name, "w", zipfile.ZIP_DEFLATED
+    ) as target:
+        for info in source.infolist():
+            if info.filename not in names:
+                target.writestr(info, source.read(info))
+        empty = not target.namelist()
+    os.chmod(temp_name, courseWriter.FILE_MODE)
+    os.replace(temp_name, file_name)
+    if empty:
+        os.remove(file_name)
+
+
+def apply(index, actions, root=ARCHIVE_ROOT, manifest_file=MANIFEST_FILE):
+    """
+    Archives, drops and deletes snapshots as planned and saves the manifest.
+    The archive and manifest are written before any live file is removed, so
+    an interrupted run loses nothing.
+    """
+    counts = {"live": 0, "archive": 0, "delete": 0}
+    removals = []
+    for series, series_actions in actions.items():
+        snapshots = index[series]
+        to_archive = [
+            snapshots[timestamp]
+            for timestamp, action in series_actions.items()
+            if action == "archive" and not snapshots[timestamp]["archived"]
+        ]
+        if to_archive:
+            add_to_archive(series, to_archive, root)
+            for entry in to_archive:
+                entry["archived"] = True
+
+        dropped = set()
+        for timestamp, action in series_actions.items():
+            counts[action] += 1
+            entry = snapshots[timestamp]
+            if action == "live":
+                continue
+            removals.extend(entry.get("paths", {}).values())
+            if action == "delete":
+                if entry["archived"]:
+                    dropped.update(entry["files"])
+                del snapshots[timestamp]
+        if dropped:
+            drop_from_archive(series, dropped, root)
 
-# Define the parent directories where your CSV and JSON folders are stored
-csv_parent_directory = "./collegeCourseData/csvFiles/"
-json_parent_directory = "./collegeCourseData/jsonFiles/"
+    manifest = {}
+    for series, snapshots in index.items():
+        entries = {
+            timestamp: {"files": entry["files"], "archived": entry["archived"]}
+            for timestamp, entry in snapshots.items()
+        }
+        if entries:
+            manifest[series] = entries
+    save_manifest(manifest, manifest_file)
 
+    for path in removals:
+        os.remove(path)
+    return counts
 
-# Function to check if a file is older than 15 minutes
-def is_file_old(file_path):
-    now = datetime.datetime.now()
-    file_creation_time = datetime.datetime.fromtimestamp(os.path.getctime(file_path))
-    time_difference = now - file_creation_time
-    return time_difference.total_seconds() > 900  # 900 seconds = 15 minutes
 
+def read_snapshot(series, name, root=ARCHIVE_ROOT):
+    """
+    Returns the text of one snapshot file, whether it is still a plain file
+    or has been archived.
+    """
+    college = series.split("/")[0]
+    for live_root in LIVE_ROOTS:
+        path = os.path.join(live_root, college, name)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                return file.read()
+    with zipfile.ZipFile(archive_file(series, root)) as archive:
+        return archive.read(name).decode("utf-8")
 
-# Function to clean up files in a directory
-def clean_directory(directory_path, file_extension):
-    # Get a list of all files with the specified extension in the directory
-    files = glob.glob(os.path.join(directory_path, f"*.{file_extension}"))
 
-    if not files:
-        print(f"No {file_extension.upper()} files found in {directory_path}.")
-    else:
-        # Sort the files by modification time (oldest first)
-        files.sort(key=os.path.getmtime)
+def restore(series, output, root=ARCHIVE_ROOT):
+    # Extracts a series archive into output/<College>/ for the usual readers
+    directory = os.path.join(output, series.split("/")[0])
+    os.makedirs(directory, exist_ok=True)
+    with zipfile.ZipFile(archive_file(series, root)) as archive:
+        archive.extractall(directory)
+    return directory
 
-        # Keep the most recent file and delete the rest if they are older than 15 minutes
-        for file_path in files[:-1]:
-            if is_file_old(file_path):
-                print(f"Deleting old {file_extension.upper()} file: {file_path}")
-                os.remove(file_path)
-            else:
-                print(f"Keeping {file_extension.upper()} file: {file_path}")
 
-        # Run your scraping script here
-        # Replace the following line with your actual scraping logic
-        print(f"Running scraping script for {directory_path}...")
+def main():
+    parser = argparse.ArgumentParser(
+        description="Keep recent snapshots, archive a thinned history, drop the rest"
+    )
+    parser.add_argument("--keep-last", type=int, default=1)
+    parser.add_argument(
+        "--min-age", type=float, default=15, help="minutes a snapshot stays live"
+    )
+    parser.add_argument(
+        "--hourly", type=int, default=24, help="hours of hourly history"
+    )
+    parser.add_argument("--daily", type=int, default=30, help="days of daily history")
+    parser.add_argument("--max-bytes", type=int, help="per college")
+    parser.add_argument("--dry-run", action="store_true", help="only show the plan")
+    parser.add_argument("--list", action="store_true", help="show the index and exit")
+    parser.add_argument(
+        "--restore",
+        metavar="SERIES",
+        help="extract an archive, e.g. HunterCollege/HTR01_1242_SPAN_UGRD",
+    )
+    parser.add_argument("--output", default="restored", help="folder for --restore")
+    args = parser.parse_args()
 
-        # Add your scraping logic here
-        # For example, you can call another script or function to perform the scraping
-        # Replace the following line with your actual scraping logic
-        # os.system("python scrape.py")
+    if args.restore:
+        logging.info(f"Restored into {restore(args.restore, args.output)}")
+        return
 
+    index = build_index(load_manifest(), scan_live())
+    if args.list:
+        for series, snapshots in sorted(index.items()):
+            archived = sum(entry["archived"] for entry in snapshots.values())
+            size = sum(sum(entry["files"].values()) for entry in snapshots.values())
+            print(
+                f"{series:<50} {len(snapshots) - archived:>5} live "
+                f"{archived:>5} archived {size:>12} bytes"
+            )
+        return
 
-# Process CSV files
-for csv_directory in os.listdir(csv_parent_directory):
-    csv_directory_path = os.path.join(csv_parent_directory, csv_directory)
+    policy = RetentionPolicy(
+        args.keep_last, args.min_age * 60, args.hourly, args.daily, args.max_bytes
+    )
+    actions = plan(index, policy)
+    if args.dry_run:
+        for series, series_actions in sorted(actions.items()):
+            for timestamp, action in sorted(series_actions.items()):
+                print(f"{action:<8} {series} {timestamp}")
+        return
 
-    # Check if it's a directory
-    if os.path.isdir(csv_directory_path):
-        clean_directory(csv_directory_path, "csv")
+    counts = apply(index, actions)
+    logging.info(
+        f"Kept {counts['live']} snapshots, {counts['archive']} archived, "
+        f"{counts['delete']} deleted"
+    )
 
-# Process JSON files
-for json_directory in os.listdir(json_parent_directory):
-    json_directory_path = os.path.join(json_parent_directory, json_directory)
 
-    # Check if it's a directory
-    if os.path.isdir(json_directory_path):
-        clean_directory(json_directory_path, "json")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+import argparse
+import csv
+import glob
+import json
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import time
+import numpy as np
+import courseWriter
+import sectionQuery
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+COLUMNAR_ROOT = os.path.join("collegeCourseData", "columnarFiles")
+EXTENSION = "cols"
+MAGIC = b"CUNYCOL1"
+ALIGNMENT = 8
+
+# Text columns are stored as small integer codes plus one dictionary each
+DICTIONARY_COLUMNS = [
+    "course_name",
+    "section",
+    "days_times",
+    "room",
+    "instructor",
+    "instruction_mode",
+    "meeting_dates",
+    "status",
+]
+# Integer columns: the class number and the leading number of the section.
+# Class numbers that do not survive int() unchanged ("01234", "12345A") are
+# stored as -1 and their text is kept in the class column's "texts".
+INTEGER_COLUMNS = ["class", "section_number"]
+
+
+def to_int(text):
+    # Leading digits only; the section number is for filtering, not display
+    digits = ""
+    for character in text:
+        if not character.isdigit():
+            break
+        digits += character
+    return int(digits) if digits else -1
+
+
+def code_dtype(size):
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if size <= np.iinfo(dtype).max + 1:
+            return dtype
+    return np.uint64
+
+
+def int_dtype(values):
+    # The smallest signed type holding every value; -1 marks a missing number
+    low = min(values, default=-1)
+    high = max(values, default=0)
+    for dtype in (np.int16, np.int32):
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def encode_columns(data):
+    """
+    Turns the combined course list into {column: numpy array} plus the
+    dictionary of every text column.
+    """
+    lookups = {column: {} for column in DICTIONARY_COLUMNS}
+    codes = {column: [] for column in DICTIONARY_COLUMNS}
+    integers = {column: [] for column in INTEGER_COLUMNS}
+    class_texts = {}
+
+    for course in data:
+        for class_info in course["classes"]:
+            row = dict(class_info, course_name=course["course_name"])
+            for column in DICTIONARY_COLUMNS:
+                lookup = lookups[column]
+                codes[column].append(lookup.setdefault(row[column], len(lookup)))
+            number = sectionQuery.class_number(row["class"])
+            if number < 0:
+                class_texts[len(integers["class"])] = row["class"]
+            integers["class"].append(number)
+            integers["section_number"].append(to_int(row["section"]))
+
+    arrays = {
+        column: np.array(codes[column], dtype=code_dtype(len(lookups[column])))
+        for column in DICTIONARY_COLUMNS
+    }
+    for column in INTEGER_COLUMNS:
+        values = integers[column]
+        arrays[column] = np.array(values, dtype=int_dtype(values))
+    dictionaries = {column: list(lookups[column]) for column in DICTIONARY_COLUMNS}
+    return arrays, dictionaries, class_texts
+
+
+def write_columnar(data, file_name):
+    """
+    Writes one snapshot as a single packed file: MAGIC, a 4-byte header
+    length, a JSON header with the offset of every column and dictionary,
+    then the 8-byte aligned column bytes, through courseWriter.atomic_open.
+    """
+    arrays, dictionaries, class_texts = encode_columns(data)
+    blobs = []
+    columns = {}
+    offset = 0
+
+    def add_json(value):
+        return add_blob(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+    def add_blob(blob):
+        nonlocal offset
+        start = offset
+        padding = -len(blob) % ALIGNMENT
+        blobs.append(blob + b"\0" * padding)
+        offset += len(blob) + padding
+        return [start, len(blob)]
+
+    for column, array in arrays.items():
+        columns[column] = {"dtype": array.dtype.str, "data": add_blob(array.tobytes())}
+        if column in dictionaries:
+            columns[column]["dictionary"] = add_json(dictionaries[column])
+    if class_texts:
+        columns["class"]["texts"] = add_json(class_texts)
+
+    header = json.dumps({"rows": len(arrays["class"]), "columns": columns}).encode(
+        "utf-8"
+    )
+    header += b" " * (-(len(MAGIC) + 4 + len(header)) % ALIGNMENT)
+
+    os.makedirs(os.path.dirname(file_name) or ".", exist_ok=True)
+    with courseWriter.atomic_open(file_name, binary=True) as file:
+        file.write(MAGIC + struct.pack("<I", len(header)) + header)
+        file.writelines(blobs)
+    return len(arrays["class"])
+
+
+def save_columnar(
+    data,
+    collegeName,
+    selected_collegeCode,
+    term_selected,
+    subjectName,
+    whichCareer,
+    current_date,
+):
+    file_name = os.path.join(
+        COLUMNAR_ROOT,
+        collegeName,
+        f"{selected_collegeCode}_{term_selected}_{subjectName}_{whichCareer}"
+        f"-{current_date}.{EXTENSION}",
+    )
+    rows = write_columnar(data, file_name)
+    logging.info(f"Columnar file has been saved: {file_name} ({rows} rows)")
+    return file_name
+
+
+class ColumnarSnapshot:
+    """
+    Reads a columnar file lazily. Only the header is parsed up front; columns
+    are views into one memory map and dictionaries are decoded only for the
+    text columns that are used.
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        with open(file_name, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a columnar course file: {file_name}")
+            (header_length,) = struct.unpack("<I", file.read(4))
+            header = json.loads(file.read(header_length))
+        self.data_start = len(MAGIC) + 4 + header_length
+        self.rows = header["rows"]
+        self.layout = header["columns"]
+        self.columns = list(self.layout)
+        self.memory_map = None
+        self.arrays = {}
+        self.dictionaries = {}
+        self.class_texts = None
+
+    def blob(self, offset, length):
+        if self.memory_map is None:
+            self.memory_map = np.memmap(self.file_name, dtype=np.uint8, mode="r")
+        start = self.data_start + offset
+        return self.memory_map[start : start + length]
+
+    def array(self, column):
+        if column not in self.arrays:
+            layout = self.layout[column]
+            self.arrays[column] = self.blob(*layout["data"]).view(layout["dtype"])
+        return self.arrays[column]
+
+    def dictionary(self, column):
+        if column not in self.dictionaries:
+            blob = self.blob(*self.layout[column]["dictionary"])
+            self.dictionaries[column] = json.loads(blob.tobytes())
+        return self.dictionaries[column]
+
+    def texts(self):
+        # Row -> original text of the class numbers stored as -1
+        if self.class_texts is None:
+            layout = self.layout["class"]
+            texts = {}
+            if "texts" in layout:
+                texts = json.loads(self.blob(*layout["texts"]).tobytes())
+            self.class_texts = {int(row): text for row, text in texts.items()}
+        return self.class_texts
+
+    def code_of(self, column, value):
+        # -1 never matches, so an unknown value selects no rows
+        try:
+            return self.dictionary(column).index(value)
+        except ValueError:
+            return -1
+
+    def column(self, column, positions=None):
+        array = self.array(column)
+        if positions is not None:
+            array = array[positions]
+        if column == "class":
+            # The same text as the JSON and CSV files of the scrape
+            rows = np.arange(self.rows)
+            if positions is not None:
+                rows = rows[positions]
+            texts = self.texts()
+            return [
+                texts.get(row, str(number))
+                for row, number in zip(rows.tolist(), array.tolist())
+            ]
+        if column in INTEGER_COLUMNS:
+            return array.tolist()
+        values = self.dictionary(column)
+        return [values[code] for code in array.tolist()]
+
+    def to_rows(self, columns=None, positions=None):
+        columns = columns or self.columns
+        decoded = [self.column(column, positions) for column in columns]
+        return [dict(zip(columns, values)) for values in zip(*decoded)]
+
+
+def filter_by_course_number(snapshot, course_number):
+    """
+    ClassStatus-style lookup that touches only the course_name, status,
+    class and section columns. Returns (open classes, closed classes).
+    """
+    names = snapshot.dictionary("course_name")
+    wanted = [
+        code
+        for code, name in enumerate(names)
+        if len(name.split()) > 1 and name.split()[1] == course_number
+    ]
+    rows = np.flatnonzero(np.isin(snapshot.array("course_name"), wanted))
+
+    statuses = snapshot.array("status")[rows]
+    columns = ["course_name", "class", "section", "status"]
+    results = []
+    for status in ("Open", "Closed"):
+        positions = rows[statuses == snapshot.code_of("status", status)]
+        results.append(snapshot.to_rows(columns, positions))
+    return results[0], results[1]
+
+
+def compare(json_file, csv_file, repeat=20):
+    """
+    Converts one JSON snapshot to the columnar format and reports size and
+    load time against the JSON and CSV files of the same scrape.
+    """
+    with open(json_file, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    directory = tempfile.mkdtemp()
+    columnar_file = os.path.join(directory, f"snapshot.{EXTENSION}")
+    try:
+        write_columnar(data, columnar_file)
+
+        def timed(load):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                load()
+            return (time.perf_counter() - start) / repeat * 1000
+
+        def load_json():
+            with open(json_file, "r", encoding="utf-8") as file:
+                json.load(file)
+
+        def load_csv():
+            with open(csv_file, "r", encoding="utf-8") as file:
+                list(csv.DictReader(file))
+
+        def load_columnar_all():
+            ColumnarSnapshot(columnar_file).to_rows()
+
+        def load_columnar_status():
+            snapshot = ColumnarSnapshot(columnar_file)
+            snapshot.column("class")
+            snapshot.column("status")
+
+        return [
+            ("json", os.path.getsize(json_file), timed(load_json)),
+            ("csv", os.path.getsize(csv_file), timed(load_csv)),
+            (
+                "columnar, all columns",
+                os.path.getsize(columnar_file),
+                timed(load_columnar_all),
+            ),
+            (
+                "columnar, class+status",
+                os.path.getsize(columnar_file),
+                timed(load_columnar_status),
+            ),
+        ]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar course snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compare_parser = commands.add_parser(
+        "compare", help="compare size and load time with the JSON/CSV files"
+    )
+    compare_parser.add_argument(
+        "--root", default="collegeCourseData", help="folder with jsonFiles/csvFiles"
+    )
+
+    query_parser = commands.add_parser("query", help="open/closed classes of a course")
+    query_parser.add_argument("snapshot", help=f"a .{EXTENSION} file")
+    query_parser.add_argument("course_number")
+
+    args = parser.parse_args()
+    if args.command == "query":
+        open_classes, closed_classes = filter_by_course_number(
+            ColumnarSnapshot(args.snapshot), args.course_number
+        )
+        print(f"Open classes for {args.course_number}:")
+        for cls in open_classes:
+            print(f"  Class: {cls['class']}, Section: {cls['section']}")
+        print(f"\nClosed classes for {args.course_number}:")
+        for cls in closed_classes:
+            print(f"  Class: {cls['class']}, Section: {cls['section']}")
+        return
+
+    json_root = os.path.join(args.root, "jsonFiles")
+    for json_file in sorted(glob.glob(os.path.join(json_root, "*", "*.json"))):
+        csv_file = (
+            json_file.replace(json_root, os.path.join(args.root, "csvFiles"), 1)[:-4]
+            + "csv"
+        )
+        if not os.path.exists(csv_file):
+            continue
+        print(os.path.basename(json_file)[:-5])
+        for name, size, milliseconds in compare(json_file, csv_file):
+            print(f"  {name:<24} {size:>9,} bytes {milliseconds:>8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
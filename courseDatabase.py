@@ -0,0 +1,422 @@
+import argparse
+import datetime
+import logging
+import os
+import re
+import sqlite3
+import sectionQuery
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+DATABASE_FILE = os.path.join("collegeCourseData", "courses.db")
+
+SECTION_FIELDS = [
+    "section",
+    "days_times",
+    "room",
+    "instructor",
+    "instruction_mode",
+    "meeting_dates",
+    "status",
+]
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# Fields whose words go into the search postings, and their token prefix
+TOKEN_FIELDS = {
+    "course_name": "course",
+    "instructor": "instructor",
+    "room": "room",
+    "instruction_mode": "mode",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    id INTEGER PRIMARY KEY,
+    college TEXT NOT NULL,
+    college_code TEXT NOT NULL,
+    term TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    career TEXT NOT NULL,
+    course_number TEXT NOT NULL,
+    course_name TEXT NOT NULL,
+    UNIQUE (college_code, term, subject, career, course_name)
+);
+CREATE INDEX IF NOT EXISTS courses_lookup
+    ON courses (college_code, term, subject, course_number);
+CREATE INDEX IF NOT EXISTS courses_number ON courses (subject, course_number);
+
+CREATE TABLE IF NOT EXISTS sections (
+    id INTEGER PRIMARY KEY,
+    course_id INTEGER NOT NULL REFERENCES courses (id),
+    class_number TEXT NOT NULL,
+    section TEXT,
+    days_times TEXT,
+    room TEXT,
+    instructor TEXT,
+    instruction_mode TEXT,
+    meeting_dates TEXT,
+    status TEXT,
+    updated TEXT NOT NULL,
+    day_mask INTEGER NOT NULL DEFAULT 0,
+    start_minute INTEGER NOT NULL DEFAULT -1,
+    end_minute INTEGER NOT NULL DEFAULT -1,
+    dropped TEXT,
+    UNIQUE (course_id, class_number)
+);
+CREATE INDEX IF NOT EXISTS sections_class_number ON sections (class_number);
+
+CREATE TABLE IF NOT EXISTS status_history (
+    id INTEGER PRIMARY KEY,
+    section_id INTEGER NOT NULL REFERENCES sections (id),
+    status TEXT,
+    time TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS status_history_section
+    ON status_history (section_id, time);
+
+-- Time of the latest scrape saved for each college/term/subject/career
+CREATE TABLE IF NOT EXISTS scrapes (
+    college_code TEXT NOT NULL,
+    term TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    career TEXT NOT NULL,
+    scraped TEXT NOT NULL,
+    PRIMARY KEY (college_code, term, subject, career)
+);
+
+-- Inverted index from "field:word" tokens to the sections listed now
+CREATE TABLE IF NOT EXISTS postings (
+    token TEXT NOT NULL,
+    section_id INTEGER NOT NULL,
+    PRIMARY KEY (token, section_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_section ON postings (section_id);
+"""
+
+# Created once migrate() has added the columns they cover
+INDEXES = """
+CREATE INDEX IF NOT EXISTS sections_start ON sections (start_minute);
+"""
+
+# Columns of sections added after the first version of the database
+ADDED_COLUMNS = {
+    "day_mask": "INTEGER NOT NULL DEFAULT 0",
+    "start_minute": "INTEGER NOT NULL DEFAULT -1",
+    "end_minute": "INTEGER NOT NULL DEFAULT -1",
+    "dropped": "TEXT",
+}
+
+
+# Database files whose schema this process has already checked
+ensured = set()
+
+
+def connect(database_file=None):
+    # Scrapes saved by several processes may write at the same time
+    connection = sqlite3.connect(database_file or DATABASE_FILE, timeout=30)
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+def ensure_schema(database_file=None):
+    """
+    Creates or migrates the tables of the database once per process. Writers
+    call it before writing; readers only connect.
+    """
+    database_file = database_file or DATABASE_FILE
+    if os.path.abspath(database_file) in ensured:
+        return
+    os.makedirs(os.path.dirname(database_file) or ".", exist_ok=True)
+    connection = connect(database_file)
+    try:
+        # WAL is stored in the file, so readers keep it without setting it
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.executescript(SCHEMA)
+        migrate(connection)
+        connection.executescript(INDEXES)
+    finally:
+        connection.close()
+    ensured.add(os.path.abspath(database_file))
+
+
+def exists(database_file=None):
+    # Readers of a database nothing was saved to yet find no rows
+    return os.path.exists(database_file or DATABASE_FILE)
+
+
+def migrate(connection):
+    # Gives a database from before the section search its columns and postings
+    existing = {
+        row["name"] for row in connection.execute("PRAGMA table_info(sections)")
+    }
+    missing = [column for column in ADDED_COLUMNS if column not in existing]
+    if not missing:
+        return
+    with connection:
+        for column in missing:
+            connection.execute(
+                f"ALTER TABLE sections ADD COLUMN {column} {ADDED_COLUMNS[column]}"
+            )
+        rows = connection.execute(
+            "SELECT courses.course_name, sections.* FROM sections"
+            " JOIN courses ON courses.id = sections.course_id"
+        ).fetchall()
+        for row in rows:
+            connection.execute(
+                "UPDATE sections SET day_mask = ?, start_minute = ?, end_minute = ?"
+                " WHERE id = ?",
+                section_times(row) + (row["id"],),
+            )
+            write_postings(connection, row["id"], row)
+    logging.info(f"Added {', '.join(missing)} to the sections of the database")
+
+
+def words(text):
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+def section_times(row):
+    # (day bitmask, start minute, end minute) as sectionQuery parses them
+    return sectionQuery.parse_days_times(row["days_times"] or "")
+
+
+def write_postings(connection, section_id, row):
+    connection.execute("DELETE FROM postings WHERE section_id = ?", (section_id,))
+    connection.executemany(
+        "INSERT OR IGNORE INTO postings (token, section_id) VALUES (?, ?)",
+        [
+            (f"{prefix}:{word}", section_id)
+            for field, prefix in TOKEN_FIELDS.items()
+            for word in set(words(row[field]))
+        ],
+    )
+
+
+def split_course_name(course_name):
+    # "CSCI 101 - Course Title" -> ("CSCI", "101")
+    parts = course_name.split()
+    return (parts[0], parts[1]) if len(parts) > 1 else (course_name, "")
+
+
+def save_courses(
+    data,
+    collegeName,
+    selected_collegeCode,
+    term_selected,
+    subjectName,
+    whichCareer,
+    database_file=None,
+    updated=None,
+):
+    """
+    Upserts one scrape in a single transaction and records a status history
+    row for every section whose status is new or changed. Only new or changed
+    sections get their times and search postings rewritten; sections missing
+    from the scrape are marked dropped. Returns the number of sections that
+    changed.
+    """
+    updated = updated or datetime.datetime.now().isoformat(timespec="seconds")
+    series = (selected_collegeCode, term_selected, subjectName, whichCareer)
+    changed = 0
+    seen = set()
+    ensure_schema(database_file)
+    connection = connect(database_file)
+    try:
+        with connection:
+            connection.execute(
+                "INSERT INTO scrapes (college_code, term, subject, career, scraped)"
+                " VALUES (?, ?, ?, ?, ?) ON CONFLICT (college_code, term, subject,"
+                " career) DO UPDATE SET scraped = excluded.scraped",
+                series + (updated,),
+            )
+            for course in data:
+                _, course_number = split_course_name(course["course_name"])
+                connection.execute(
+                    "INSERT INTO courses (college, college_code, term, subject, career,"
+                    " course_number, course_name) VALUES (?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT DO NOTHING",
+                    (collegeName,) + series + (course_number, course["course_name"]),
+                )
+                course_id = connection.execute(
+                    "SELECT id FROM courses WHERE college_code = ? AND term = ?"
+                    " AND subject = ? AND career = ? AND course_name = ?",
+                    series + (course["course_name"],),
+                ).fetchone()["id"]
+
+                for class_info in course["classes"]:
+                    row = dict(class_info, course_name=course["course_name"])
+                    previous = connection.execute(
+                        "SELECT * FROM sections"
+                        " WHERE course_id = ? AND class_number = ?",
+                        (course_id, class_info["class"]),
+                    ).fetchone()
+                    values = tuple(class_info[field] for field in SECTION_FIELDS)
+                    if (
+                        previous is not None
+                        and previous["dropped"] is None
+                        and tuple(previous[field] for field in SECTION_FIELDS) == values
+                    ):
+                        seen.add(previous["id"])
+                        connection.execute(
+                            "UPDATE sections SET updated = ? WHERE id = ?",
+                            (updated, previous["id"]),
+                        )
+                        continue
+
+                    changed += 1
+                    if previous is None:
+                        section_id = connection.execute(
+                            "INSERT INTO sections (section, days_times, room,"
+                            " instructor, instruction_mode, meeting_dates, status,"
+                            " updated, day_mask, start_minute, end_minute, course_id,"
+                            " class_number)"
+                            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            values
+                            + (updated,)
+                            + section_times(row)
+                            + (course_id, class_info["class"]),
+                        ).lastrowid
+                    else:
+                        section_id = previous["id"]
+                        connection.execute(
+                            "UPDATE sections SET section = ?, days_times = ?,"
+                            " room = ?, instructor = ?, instruction_mode = ?,"
+                            " meeting_dates = ?, status = ?, updated = ?,"
+                            " day_mask = ?, start_minute = ?, end_minute = ?,"
+                            " dropped = NULL WHERE id = ?",
+                            values + (updated,) + section_times(row) + (section_id,),
+                        )
+                    seen.add(section_id)
+                    write_postings(connection, section_id, row)
+
+                    if previous is None or previous["status"] != class_info["status"]:
+                        connection.execute(
+                            "INSERT INTO status_history (section_id, status, time)"
+                            " VALUES (?, ?, ?)",
+                            (section_id, class_info["status"], updated),
+                        )
+
+            # An empty page is more likely blocked than a subject with no classes
+            if data:
+                changed += drop_missing(connection, series, seen, updated)
+    finally:
+        connection.close()
+    logging.info(
+        f"SQLite database has been updated: {database_file or DATABASE_FILE} "
+        f"({changed} sections changed)"
+    )
+    return changed
+
+
+def drop_missing(connection, series, seen, dropped):
+    # Marks the listed sections of the series that the scrape did not return
+    missing = [
+        row["id"]
+        for row in connection.execute(
+            "SELECT sections.id FROM sections"
+            " JOIN courses ON courses.id = sections.course_id"
+            " WHERE courses.college_code = ? AND courses.term = ?"
+            " AND courses.subject = ? AND courses.career = ?"
+            " AND sections.dropped IS NULL",
+            series,
+        )
+        if row["id"] not in seen
+    ]
+    for section_id in missing:
+        connection.execute(
+            "UPDATE sections SET dropped = ? WHERE id = ?", (dropped, section_id)
+        )
+        connection.execute("DELETE FROM postings WHERE section_id = ?", (section_id,))
+    return len(missing)
+
+
+def find_sections(
+    subject,
+    course_number,
+    status=None,
+    college_code=None,
+    term=None,
+    database_file=None,
+):
+    """
+    Returns the sections of one course, e.g. find_sections("CSCI", "101",
+    "Open"). The lookup is an index seek on courses_lookup, or on
+    courses_number when no college is given.
+    """
+    query = (
+        "SELECT courses.college_code, courses.term, courses.course_name,"
+        " sections.* FROM courses JOIN sections ON sections.course_id = courses.id"
+        " WHERE courses.subject = ? AND courses.course_number = ?"
+        " AND sections.dropped IS NULL"
+    )
+    parameters = [subject, course_number]
+    if college_code:
+        query += " AND courses.college_code = ?"
+        parameters.append(college_code)
+    if term:
+        query += " AND courses.term = ?"
+        parameters.append(term)
+    if status:
+        query += " AND sections.status = ?"
+        parameters.append(status)
+
+    if not exists(database_file):
+        return []
+    connection = connect(database_file)
+    try:
+        return [dict(row) for row in connection.execute(query, parameters)]
+    finally:
+        connection.close()
+
+
+def status_history(class_number, database_file=None):
+    if not exists(database_file):
+        return []
+    connection = connect(database_file)
+    try:
+        return [
+            dict(row)
+            for row in connection.execute(
+                "SELECT courses.college_code, courses.term, courses.course_name,"
+                " status_history.status, status_history.time FROM sections"
+                " JOIN courses ON courses.id = sections.course_id"
+                " JOIN status_history ON status_history.section_id = sections.id"
+                " WHERE sections.class_number = ? ORDER BY status_history.time",
+                (class_number,),
+            )
+        ]
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up sections in the database")
+    parser.add_argument("subject", help="e.g. CSCI")
+    parser.add_argument("course_number", help="e.g. 101")
+    parser.add_argument("--status", help="e.g. Open")
+    parser.add_argument("--college", help="college code, e.g. JJC01")
+    parser.add_argument("--term", help="term code, e.g. 1242")
+    parser.add_argument("--database", default=DATABASE_FILE)
+    args = parser.parse_args()
+
+    sections = find_sections(
+        args.subject,
+        args.course_number,
+        args.status,
+        args.college,
+        args.term,
+        args.database,
+    )
+    for section in sections:
+        print(
+            f"{section['college_code']} {section['term']} Class: "
+            f"{section['class_number']}, Section: {section['section']}, "
+            f"Status: {section['status']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
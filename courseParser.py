@@ -0,0 +1,311 @@
+from bs4 import BeautifulSoup
+import argparse
+import json
+import logging
+import time
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+
+# Class, section, days/times, room, instructor, mode and dates come first;
+# the status cell follows them. Rows with fewer cells (headers, notes) are
+# not classes
+CLASS_CELLS = 7
+
+
+def strip_join(strings):
+    # Matches BeautifulSoup's get_text(strip=True)
+    return "".join(text.strip() for text in strings if text.strip())
+
+
+def build_class_info(cell_texts, status):
+    return {
+        "class": cell_texts[0],
+        "section": cell_texts[1],
+        "days_times": cell_texts[2],
+        "room": cell_texts[3],
+        "instructor": cell_texts[4],
+        "instruction_mode": cell_texts[5],
+        "meeting_dates": cell_texts[6],
+        "status": status,
+    }
+
+
+class SoupBackend:
+    """
+    Pure-Python fallback built on BeautifulSoup's html.parser.
+
+    Every backend has the same shape: iter_blocks yields ("heading", name)
+    and ("table", [class_info, ...]) in document order. Class rows are taken
+    from every tr of the table, so a table with or without tbody elements
+    (which some parsers add and others do not) gives the same classes.
+    """
+
+    name = "html.parser"
+
+    @staticmethod
+    def is_heading_or_table(tag):
+        classes = tag.get("class") or []
+        return "testing_msg" in classes or (
+            tag.name == "table" and "classinfo" in classes
+        )
+
+    def parse_class_row(self, class_row):
+        cells = class_row.find_all("td")
+        if len(cells) < CLASS_CELLS:
+            return None
+        status_img = (
+            cells[CLASS_CELLS].find("img") if len(cells) > CLASS_CELLS else None
+        )
+        status = status_img["title"] if status_img else "Unknown"
+        return build_class_info(
+            [cell.get_text(strip=True) for cell in cells[:CLASS_CELLS]], status
+        )
+
+    def iter_blocks(self, html_content):
+        soup = BeautifulSoup(html_content, "html.parser")
+        for element in soup.find_all(self.is_heading_or_table):
+            if element.name != "table":
+                span_element = element.find("span")
+                if span_element:
+                    yield "heading", span_element.get_text().strip()
+                continue
+
+            classes = []
+            for class_row in element.find_all("tr"):
+                class_info = self.parse_class_row(class_row)
+                if class_info:
+                    classes.append(class_info)
+            yield "table", classes
+
+
+class LxmlBackend:
+    """libxml2-backed parser through lxml.html."""
+
+    name = "lxml"
+    BLOCKS_XPATH = (
+        "//*[contains(concat(' ', normalize-space(@class), ' '), ' testing_msg ')"
+        " or (self::table and"
+        " contains(concat(' ', normalize-space(@class), ' '), ' classinfo '))]"
+    )
+
+    def parse_class_row(self, class_row):
+        cells = list(class_row.iter("td"))
+        if len(cells) < CLASS_CELLS:
+            return None
+        status_img = (
+            next(cells[CLASS_CELLS].iter("img"), None)
+            if len(cells) > CLASS_CELLS
+            else None
+        )
+        status = status_img.get("title") if status_img is not None else "Unknown"
+        return build_class_info(
+            [strip_join(cell.itertext()) for cell in cells[:CLASS_CELLS]], status
+        )
+
+    def iter_blocks(self, html_content):
+        if not html_content.strip():
+            return
+        root = lxml.html.fromstring(html_content)
+        for element in root.xpath(self.BLOCKS_XPATH):
+            if element.tag != "table":
+                span_element = next(element.iter("span"), None)
+                if span_element is not None:
+                    yield "heading", "".join(span_element.itertext()).strip()
+                continue
+
+            classes = []
+            for class_row in element.iter("tr"):
+                class_info = self.parse_class_row(class_row)
+                if class_info:
+                    classes.append(class_info)
+            yield "table", classes
+
+
+class SelectolaxBackend:
+    """Lexbor-backed parser through selectolax, the fastest option."""
+
+    name = "selectolax"
+
+    @staticmethod
+    def cell_text(cell):
+        return strip_join(
+            node.text_content
+            for node in cell.traverse(include_text=True)
+            if node.tag == "-text"
+        )
+
+    def parse_class_row(self, class_row):
+        cells = class_row.css("td")
+        if len(cells) < CLASS_CELLS:
+            return None
+        status_img = (
+            cells[CLASS_CELLS].css_first("img") if len(cells) > CLASS_CELLS else None
+        )
+        status = status_img.attributes.get("title") if status_img else "Unknown"
+        return build_class_info(
+            [self.cell_text(cell) for cell in cells[:CLASS_CELLS]], status
+        )
+
+    def iter_blocks(self, html_content):
+        tree = LexborHTMLParser(html_content)
+        for element in tree.css(".testing_msg, table.classinfo"):
+            if element.tag != "table":
+                span_element = element.css_first("span")
+                if span_element:
+                    yield "heading", span_element.text().strip()
+                continue
+
+            classes = []
+            for class_row in element.css("tr"):
+                class_info = self.parse_class_row(class_row)
+                if class_info:
+                    classes.append(class_info)
+            yield "table", classes
+
+
+BACKENDS = {
+    SelectolaxBackend.name: (SelectolaxBackend, LexborHTMLParser),
+    LxmlBackend.name: (LxmlBackend, lxml),
+    SoupBackend.name: (SoupBackend, True),
+}
+
+
+def available_backends():
+    return [name for name, (_, module) in BACKENDS.items() if module]
+
+
+def get_backend(name=None):
+    """
+    Returns the named backend, or the fastest installed one. Falls back to
+    html.parser when the requested C parser is not installed.
+    """
+    if name is None:
+        name = available_backends()[0]
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown parser backend: {name}")
+
+    backend_class, module = BACKENDS[name]
+    if not module:
+        logging.warning(f"{name} is not installed, falling back to html.parser.")
+        backend_class = SoupBackend
+    return backend_class()
+
+
+def parse_course_results(html_content, backend=None):
+    """
+    Parses a results page into the combined course list in one walk over the
+    tree. Each classinfo table belongs to the closest .testing_msg heading
+    before it, so the college and subject headings at the top (which have no
+    table) simply produce no course.
+    """
+    if not hasattr(backend, "iter_blocks"):
+        backend = get_backend(backend)
+
+    combined_courses = []
+    course_name = None
+    course_data = None
+
+    for kind, value in backend.iter_blocks(html_content):
+        if kind == "heading":
+            course_name = value
+            course_data = None
+            continue
+
+        if course_name is None:
+            logging.warning("Skipping a classinfo table with no course heading.")
+            continue
+
+        if course_data is None:
+            course_data = {"course_name": course_name, "classes": []}
+            combined_courses.append(course_data)
+        course_data["classes"].extend(value)
+
+    return combined_courses
+
+
+def iter_course_results(html_content, backend=None):
+    """
+    Yields (course_name, class_info) for every section as each table is
+    parsed, so writers can stream rows without the whole course list.
+    """
+    if not hasattr(backend, "iter_blocks"):
+        backend = get_backend(backend)
+
+    course_name = None
+    for kind, value in backend.iter_blocks(html_content):
+        if kind == "heading":
+            course_name = value
+        elif course_name is None:
+            logging.warning("Skipping a classinfo table with no course heading.")
+        else:
+            for class_info in value:
+                yield course_name, class_info
+
+
+def check_parity(html_content):
+    """
+    Parses the page with every installed backend and returns the names of
+    the backends whose output differs from html.parser.
+    """
+    expected = parse_course_results(html_content, SoupBackend.name)
+    return [
+        name
+        for name in available_backends()
+        if parse_course_results(html_content, name) != expected
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse a saved results page")
+    parser.add_argument("html_file", help="saved results page HTML")
+    parser.add_argument("--repeat", type=int, default=1, help="times to parse")
+    parser.add_argument("--backend", choices=list(BACKENDS), help="parser backend")
+    parser.add_argument(
+        "--parity",
+        action="store_true",
+        help="check that every installed backend matches html.parser",
+    )
+    args = parser.parse_args()
+
+    with open(args.html_file, "r", encoding="utf-8") as file:
+        html_content = file.read()
+
+    if args.parity:
+        mismatched = check_parity(html_content)
+        if mismatched:
+            logging.error(f"Backends differ from html.parser: {mismatched}")
+            raise SystemExit(1)
+        logging.info(f"All backends match: {available_backends()}")
+        return
+
+    backend = get_backend(args.backend)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        combined_courses = parse_course_results(html_content, backend)
+    elapsed = (time.perf_counter() - start) / args.repeat
+
+    print(json.dumps(combined_courses, indent=4))
+    sections = sum(len(course["classes"]) for course in combined_courses)
+    logging.info(
+        f"Parsed {len(combined_courses)} courses, {sections} sections "
+        f"in {elapsed * 1000:.2f} ms with {backend.name}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import contextlib
+import csv
+import json
+import os
+import tempfile
+
+BUFFER_SIZE = 1 << 16
+
+# mkstemp makes files only the owner can read; renamed files get the usual
+# rw-r--r-- instead
+FILE_MODE = 0o644
+
+CSV_HEADER = [
+    "Course Name",
+    "Class",
+    "Section",
+    "Days & Times",
+    "Room",
+    "Instructor",
+    "Instruction Mode",
+    "Meeting Dates",
+    "Status",
+]
+
+
+@contextlib.contextmanager
+def atomic_open(file_name, newline=None, buffer_size=BUFFER_SIZE, binary=False):
+    """
+    Opens a buffered temp file next to file_name and renames it into place
+    only once writing succeeded, so readers never see a half-written file.
+    With binary=True the file takes bytes instead of text.
+    """
+    directory = os.path.dirname(file_name) or "."
+    descriptor, temp_name = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        if binary:
+            file = open(descriptor, "wb", buffering=buffer_size)
+        else:
+            file = open(
+                descriptor,
+                "w",
+                encoding="utf-8",
+                newline=newline,
+                buffering=buffer_size,
+            )
+        with file:
+            yield file
+        os.chmod(temp_name, FILE_MODE)
+        os.replace(temp_name, file_name)
+    except BaseException:
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+        raise
+
+
+def csv_row(course_name, class_info):
+    return [
+        course_name,
+        class_info["class"],
+        class_info["section"],
+        class_info["days_times"],
+        class_info["room"],
+        class_info["instructor"],
+        class_info["instruction_mode"],
+        class_info["meeting_dates"],
+        class_info["status"],
+    ]
+
+
+def iter_records(data):
+    # Flattens the combined course list into (course_name, class_info) records
+    for course in data:
+        for class_info in course["classes"]:
+            yield course["course_name"], class_info
+
+
+def write_course_records(records, csv_file_name, ndjson_file_name):
+    """
+    Writes (course_name, class_info) records to a CSV file and a
+    newline-delimited JSON file in one pass. Returns the number of rows.
+    """
+    count = 0
+    with atomic_open(csv_file_name, newline="") as csv_file, atomic_open(
+        ndjson_file_name
+    ) as ndjson_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(CSV_HEADER)
+        for course_name, class_info in records:
+            writer.writerow(csv_row(course_name, class_info))
+            ndjson_file.write(
+                json.dumps(dict(class_info, course_name=course_name)) + "\n"
+            )
+            count += 1
+    return count
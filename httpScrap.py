@@ -0,0 +1,340 @@
+from bs4 import BeautifulSoup, SoupStrainer
+from urllib.parse import urljoin
+import aiohttp
+import asyncio
+import contextlib
+import logging
+import courseParser
+import metrics
+import officalScrap
+import parsePipeline
+import resultCache
+import retryPolicy
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+# Field names used when the page does not tell us otherwise
+COLLEGE_FIELD = "inst_selection"
+TERM_FIELD = "term_value"
+SUBJECT_FIELD = "subject_name"
+CAREER_FIELD = "courseCareer"
+OPEN_ONLY_FIELD = "open_class"
+# id of the subject select, which only the subject/career form has
+SUBJECT_SELECT_ID = "subject_ld"
+
+
+def read_form(html_content, page_url):
+    """
+    Parses the first form on a page and returns it with its absolute action
+    url and the values the browser would post by default.
+    """
+    soup = BeautifulSoup(html_content, "html.parser")
+    form = soup.find("form")
+    if form is None:
+        raise ValueError(f"No form found on {page_url}")
+
+    action = urljoin(page_url, form.get("action") or page_url)
+    fields = {}
+    for field in form.find_all("input"):
+        name = field.get("name")
+        if not name or field.get("type") in ("checkbox", "radio", "submit", "button"):
+            continue
+        fields[name] = field.get("value", "")
+    for select in form.find_all("select"):
+        name = select.get("name")
+        if not name:
+            continue
+        option = select.find("option", selected=True) or select.find("option")
+        fields[name] = option.get("value", "") if option else ""
+
+    return form, action, fields
+
+
+def is_search_form(html_content):
+    """
+    Whether a page is one of the search forms rather than results. Only the
+    term and subject selects count, so a results page that mentions their
+    names in a script or a hidden field is still results. Uses the fastest
+    parser courseParser found.
+    """
+    if courseParser.LexborHTMLParser:
+        tree = courseParser.LexborHTMLParser(html_content)
+        selector = f"select#{SUBJECT_SELECT_ID}, select[name={TERM_FIELD}]"
+        return tree.css_first(selector) is not None
+    if courseParser.lxml:
+        tree = courseParser.lxml.html.fromstring(html_content)
+        path = f"//select[@id='{SUBJECT_SELECT_ID}' or @name='{TERM_FIELD}']"
+        return bool(tree.xpath(path))
+    soup = BeautifulSoup(html_content, "html.parser", parse_only=SoupStrainer("select"))
+    return (
+        soup.find(id=SUBJECT_SELECT_ID) is not None
+        or soup.find(attrs={"name": TERM_FIELD}) is not None
+    )
+
+
+def button_field(form, label):
+    # Submit buttons only send their name/value pair when they are pressed
+    for button in form.find_all(["input", "button"]):
+        name = button.get("name")
+        value = button.get("value") or button.get_text()
+        if name and value.strip() == label:
+            return name, button.get("value", label)
+    return None
+
+
+async def post_form(session, action, fields, step="post form"):
+    # Posting the same fields again is safe, so every post is retried
+    async def post():
+        async with session.post(action, data=fields) as response:
+            response.raise_for_status()
+            return await response.text(), str(response.url)
+
+    return await retryPolicy.retry(step, post, breaker=retryPolicy.breaker_for(action))
+
+
+async def get_page(session, url):
+    async def get():
+        async with session.get(url) as response:
+            response.raise_for_status()
+            return await response.text(), str(response.url)
+
+    return await retryPolicy.retry(
+        "search page", get, breaker=retryPolicy.breaker_for(url)
+    )
+
+
+async def open_subject_form(session, target, base_url=None):
+    """
+    Loads search.jsp and posts the college/term form. Returns the college
+    folder name and the parsed subject/career form.
+    """
+    user_preferences = officalScrap.target_to_preferences(target)
+    college_code = user_preferences["selected_collegeCode"]
+
+    search_url = urljoin(base_url or officalScrap.BASE_URL, officalScrap.SEARCH_PAGE)
+    html_content, page_url = await get_page(session, search_url)
+
+    # College and term form
+    form, action, fields = read_form(html_content, page_url)
+    checkbox = form.find("input", id=college_code)
+    if checkbox is None:
+        raise ValueError(f"College {college_code} not found.")
+    label = form.find("label", attrs={"for": college_code})
+    college_name = user_preferences["collegeName"] or "".join(
+        (label.get_text() if label else college_code).split()
+    )
+    fields[checkbox.get("name", COLLEGE_FIELD)] = checkbox.get("value", college_code)
+    fields[TERM_FIELD] = user_preferences["term_selected"]
+    next_button = button_field(form, "Next")
+    if next_button:
+        fields[next_button[0]] = next_button[1]
+    html_content, page_url = await post_form(
+        session, action, fields, "college and term"
+    )
+
+    subject_form = read_form(html_content, page_url)
+    if subject_form[0].find(id=SUBJECT_SELECT_ID) is None:
+        raise ValueError(f"Subject or career form not found for {target}")
+    return college_name, subject_form
+
+
+async def post_search(session, subject_form, target, open_only=False):
+    # Posts the subject/career form for one target and returns the results HTML
+    user_preferences = officalScrap.target_to_preferences(target)
+    form, action, default_fields = subject_form
+    fields = dict(default_fields)
+    subject_select = form.find(id=SUBJECT_SELECT_ID)
+    career_select = form.find(id="courseCareerId")
+    if subject_select is None or career_select is None:
+        raise ValueError(f"Subject or career form not found for {target}")
+    fields[subject_select.get("name", SUBJECT_FIELD)] = user_preferences["subjectName"]
+    fields[career_select.get("name", CAREER_FIELD)] = user_preferences["whichCareer"]
+
+    # The open-only toggle is a checkbox, so leaving it out turns it off
+    open_only_box = form.find("input", attrs={"name": OPEN_ONLY_FIELD})
+    if open_only:
+        fields[OPEN_ONLY_FIELD] = (
+            open_only_box.get("value", "O") if open_only_box else "O"
+        )
+    else:
+        fields.pop(OPEN_ONLY_FIELD, None)
+    search_button = button_field(form, "Search")
+    if search_button:
+        fields[search_button[0]] = search_button[1]
+    html_content, _ = await post_form(session, action, fields, "search submit")
+    return html_content
+
+
+async def fetch_results_html(session, target, base_url=None, open_only=False):
+    """
+    Walks the college/term and subject/career forms with plain HTTP posts and
+    returns the college folder name and the results page HTML.
+    """
+    college_name, subject_form = await open_subject_form(session, target, base_url)
+    return college_name, await post_search(session, subject_form, target, open_only)
+
+
+class SearchSession:
+    """
+    Keeps the subject/career form of the last college and term, so the next
+    subject of the same college and term is a single form post.
+    """
+
+    def __init__(self, session, base_url=None):
+        self.session = session
+        self.base_url = base_url or officalScrap.BASE_URL
+        self.key = None
+        self.college_name = None
+        self.subject_form = None
+        # Whether the last fetch was answered by resultCache
+        self.from_cache = False
+
+    def reset(self):
+        self.key = None
+        self.subject_form = None
+
+    async def fetch_results_html(self, target, open_only=False):
+        user_preferences = officalScrap.target_to_preferences(target)
+        key = (
+            user_preferences["selected_collegeCode"],
+            user_preferences["term_selected"],
+        )
+        if key == self.key:
+            try:
+                html_content = await post_search(
+                    self.session, self.subject_form, target, open_only
+                )
+                # A server that dropped the search session answers with one
+                # of the search forms instead of results
+                if not is_search_form(html_content):
+                    return self.college_name, html_content
+                logging.info("Subject form expired, starting a new search.")
+            except aiohttp.ClientResponseError as e:
+                logging.info(f"Could not re-post the subject form: {e}")
+            metrics.count("retries", step="subject form")
+
+        self.reset()
+        self.college_name, self.subject_form = await open_subject_form(
+            self.session, target, self.base_url
+        )
+        self.key = key
+        html_content = await post_search(
+            self.session, self.subject_form, target, open_only
+        )
+        return self.college_name, html_content
+
+    async def fetch(self, target, max_age=None, open_only=False):
+        # Same contract as officalScrap.SearchSession.fetch
+        user_preferences = officalScrap.target_to_preferences(target)
+        names, html_content, self.from_cache = await resultCache.cached_fetch(
+            resultCache.cache_key(self.base_url, user_preferences, open_only),
+            lambda: self.fetch_uncached(target, open_only),
+            max_age,
+        )
+        return names, html_content
+
+    async def fetch_uncached(self, target, open_only=False):
+        try:
+            with metrics.span("http search"):
+                college_name, html_content = await self.fetch_results_html(
+                    target, open_only
+                )
+        except Exception:
+            self.reset()
+            metrics.count("scrapes", engine="http", outcome="error")
+            raise
+        metrics.count("scrapes", engine="http", outcome="ok")
+        metrics.observe("html_bytes", len(html_content))
+        user_preferences = officalScrap.target_to_preferences(target)
+        names = (
+            college_name,
+            user_preferences["selected_collegeCode"],
+            user_preferences["term_selected"],
+            user_preferences["subjectName"],
+            user_preferences["whichCareer"],
+        )
+        return names, html_content
+
+    async def scrape(self, target, save=True, max_age=None):
+        names, html_content = await self.fetch(target, max_age)
+        with metrics.span("parse"):
+            combined_courses = courseParser.parse_course_results(html_content)
+        metrics.count(
+            "rows_parsed", sum(len(course["classes"]) for course in combined_courses)
+        )
+        if not combined_courses:
+            logging.warning(f"No course data found for {target}.")
+            return combined_courses
+
+        # A page from the cache was handled by the caller that fetched it
+        if save and not self.from_cache:
+            await officalScrap.save_course_data(combined_courses, *names)
+        return combined_courses
+
+
+async def scrape_target(session, target, base_url=None, save=True):
+    return await SearchSession(session, base_url).scrape(target, save)
+
+
+async def run_batch(targets, concurrency=4, save=True, base_url=None, processes=None):
+    """
+    HTTP counterpart of officalScrap.run_batch. Workers share one connection
+    pool but keep their own cookies, since the search forms are session based.
+    """
+    queue = asyncio.Queue()
+    for target in targets:
+        queue.put_nowait(target)
+    results = []
+    pending = []
+
+    async def worker(connector, pipeline):
+        async with aiohttp.ClientSession(
+            connector=connector,
+            connector_owner=False,
+            cookie_jar=aiohttp.CookieJar(unsafe=True),
+        ) as session:
+            search = SearchSession(session, base_url)
+            while True:
+                try:
+                    target = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    if pipeline is not None:
+                        names, html_content = await search.fetch(target)
+                        future = await pipeline.submit(
+                            html_content, names, save and not search.from_cache
+                        )
+                        pending.append((target, future))
+                        continue
+                    courses = await search.scrape(target, save)
+                    results.append(
+                        {"target": target, "courses": courses, "error": None}
+                    )
+                    logging.info(f"Scraped {target}: {len(courses)} courses")
+                except Exception as e:
+                    logging.error(f"An error occurred for {target}: {e}")
+                    results.append({"target": target, "courses": None, "error": str(e)})
+                    # Drop the half-walked form session before the next target
+                    session.cookie_jar.clear()
+                    search.reset()
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    try:
+        workers = max(1, min(concurrency, len(targets)))
+        async with (
+            parsePipeline.ParsePipeline(processes)
+            if processes
+            else contextlib.nullcontext()
+        ) as pipeline:
+            await asyncio.gather(*(worker(connector, pipeline) for _ in range(workers)))
+            await parsePipeline.collect(pending, results)
+    finally:
+        await connector.close()
+
+    return results
@@ -0,0 +1,148 @@
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import time
+import mockServer
+import officalScrap
+import resultCache
+import seatWatcher
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+def mock_targets(requests):
+    """
+    `requests` targets cycling through the mock's catalog. Subjects of one
+    college and term come together, as in a crawl, so form reuse is exercised.
+    """
+    catalog = itertools.product(
+        [code for code, _ in mockServer.COLLEGES],
+        [term for _, term in mockServer.TERMS],
+        [subject for _, subject in mockServer.SUBJECTS],
+        [career for _, career in mockServer.CAREERS],
+    )
+    return [
+        list(target) for target in itertools.islice(itertools.cycle(catalog), requests)
+    ]
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+async def run(targets, engine="http", concurrency=4, cache_age=0):
+    """
+    Scrapes the targets without saving and returns the wall time, per-scrape
+    latencies in milliseconds and the number of failed scrapes. The result
+    cache is off unless cache_age is given, so every scrape is a server
+    round trip.
+    """
+    queue = asyncio.Queue()
+    for target in targets:
+        queue.put_nowait(target)
+    latencies = []
+    errors = 0
+
+    async with seatWatcher.open_scraper(
+        engine, concurrency, cache_age=cache_age
+    ) as scrape:
+
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                target = queue.get_nowait()
+                started = time.perf_counter()
+                try:
+                    await scrape(target)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                except Exception as e:
+                    errors += 1
+                    logging.debug(f"Scrape of {target} failed: {e}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        seconds = time.perf_counter() - start
+    return seconds, latencies, errors
+
+
+def report(seconds, latencies, errors, cache=None):
+    scrapes = len(latencies) + errors
+    # Scrapes the cache answered never reached the server
+    cache_hits = cache["requests"] - cache["misses"] if cache else 0
+    result = {
+        "scrapes": scrapes,
+        "errors": errors,
+        "cache_hits": cache_hits,
+        "round_trips": scrapes - cache_hits,
+        "seconds": round(seconds, 3),
+        "per_second": round(scrapes / seconds, 2),
+    }
+    if latencies:
+        for name, share in (("p50_ms", 0.5), ("p90_ms", 0.9), ("p99_ms", 0.99)):
+            result[name] = round(percentile(latencies, share), 2)
+        result["max_ms"] = round(max(latencies), 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="End-to-end scraper throughput against a local mock site"
+    )
+    parser.add_argument("--requests", type=int, default=100, help="scrapes to run")
+    parser.add_argument("--engine", choices=["browser", "http"], default="http")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--base-url", help="use a server that is already running instead of a mock"
+    )
+    parser.add_argument(
+        "--cache-age",
+        type=float,
+        default=0,
+        help="reuse pages fetched in the last this many seconds (default 0: off)",
+    )
+    mockServer.add_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    if args.base_url:
+        officalScrap.set_base_url(args.base_url)
+    else:
+        server = mockServer.start_server(**mockServer.settings_from_args(args))
+        officalScrap.set_base_url(mockServer.base_url(server))
+    logging.info(f"Load testing {officalScrap.BASE_URL}")
+
+    if args.cache_age:
+        # Kept in memory, so runs leave no cache files behind
+        resultCache.configure(args.cache_age, disk=False)
+    # Failed scrapes are expected when errors are injected
+    logging.getLogger().setLevel(logging.CRITICAL)
+    try:
+        seconds, latencies, errors = asyncio.run(
+            run(
+                mock_targets(args.requests),
+                args.engine,
+                args.concurrency,
+                args.cache_age,
+            )
+        )
+    finally:
+        logging.getLogger().setLevel(logging.INFO)
+        if server:
+            server.shutdown()
+
+    cache = resultCache.shared.stats() if resultCache.shared else None
+    result = report(seconds, latencies, errors, cache)
+    if server:
+        result["server"] = dict(server.RequestHandlerClass.stats)
+    print(json.dumps(result, indent=4))
+
+
+if __name__ == "__main__":
+    main()
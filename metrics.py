@@ -0,0 +1,240 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import bisect
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+# Off unless configured; every recording call returns right away when off.
+# SCRAPE_METRICS=1 turns it on for any script, SCRAPE_METRICS_FILE also
+# exports the spans.
+ENABLED = os.environ.get("SCRAPE_METRICS", "") not in ("", "0")
+EXPORT_FILE = os.environ.get("SCRAPE_METRICS_FILE")
+PREFIX = "cunybot_"
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7)
+BUCKETS = {"stage_seconds": SECONDS_BUCKETS, "html_bytes": BYTES_BUCKETS}
+
+HELP = {
+    "stage_seconds": "Time spent in each scrape stage",
+    "html_bytes": "Size of each results page",
+    "rows_parsed": "Class rows parsed from results pages",
+    "scrapes": "Finished scrapes by outcome",
+    "retries": "Steps that had to be started over",
+    "breaker_trips": "Times requests to a host were paused after many failures",
+    "breaker_rejections": "Calls turned away while a host's breaker was open",
+}
+
+lock = threading.Lock()
+counters = {}
+histograms = {}
+export_file = None
+
+NULL_SPAN = contextlib.nullcontext()
+
+
+def configure(enabled=True, export=None):
+    """
+    Turns recording on or off. With `export`, every span is also appended to
+    that file as one JSON line.
+    """
+    global ENABLED, export_file
+    ENABLED = enabled
+    if export_file:
+        export_file.close()
+        export_file = None
+    if export:
+        os.makedirs(os.path.dirname(export) or ".", exist_ok=True)
+        export_file = open(export, "a", encoding="utf-8", buffering=1)
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def count(name, value=1, **labels):
+    if not ENABLED:
+        return
+    key = (name, label_key(labels))
+    with lock:
+        counters[key] = counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    if not ENABLED:
+        return
+    key = (name, label_key(labels))
+    buckets = BUCKETS.get(name, SECONDS_BUCKETS)
+    with lock:
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = {
+                "buckets": buckets,
+                "counts": [0] * (len(buckets) + 1),
+                "sum": 0.0,
+                "count": 0,
+            }
+        histogram["counts"][bisect.bisect_left(buckets, value)] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+
+def record_span(name, start, seconds, **labels):
+    # start is a time.time() timestamp, seconds the measured duration
+    if not ENABLED:
+        return
+    observe("stage_seconds", seconds, stage=name, **labels)
+    if export_file:
+        event = {"span": name, "start": start, "ms": round(seconds * 1000, 3)}
+        event.update(labels)
+        with lock:
+            export_file.write(json.dumps(event) + "\n")
+
+
+@contextlib.contextmanager
+def timed_span(name, labels):
+    start = time.time()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, start, time.perf_counter() - started, **labels)
+
+
+def span(name, **labels):
+    """
+    Times the block as one stage: `with metrics.span("parse"): ...`.
+    """
+    if not ENABLED:
+        return NULL_SPAN
+    return timed_span(name, labels)
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in pairs) + "}"
+
+
+def render():
+    """
+    Returns every counter and histogram in the Prometheus text format.
+    """
+    lines = []
+    with lock:
+        counter_items = sorted(counters.items())
+        histogram_items = sorted(
+            (key, dict(value, counts=list(value["counts"])))
+            for key, value in histograms.items()
+        )
+
+    described = set()
+    for (name, labels), value in counter_items:
+        metric = f"{PREFIX}{name}_total"
+        if metric not in described:
+            described.add(metric)
+            lines.append(f"# HELP {metric} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric}{format_labels(labels)} {value}")
+
+    for (name, labels), histogram in histogram_items:
+        metric = f"{PREFIX}{name}"
+        if metric not in described:
+            described.add(metric)
+            lines.append(f"# HELP {metric} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, bucket_count in zip(
+            list(histogram["buckets"]) + ["+Inf"], histogram["counts"]
+        ):
+            cumulative += bucket_count
+            bucket_labels = format_labels(labels, [("le", bound)])
+            lines.append(f"{metric}_bucket{bucket_labels} {cumulative}")
+        lines.append(f"{metric}_sum{format_labels(labels)} {histogram['sum']}")
+        lines.append(f"{metric}_count{format_labels(labels)} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def summary():
+    # Count, total and mean of every stage, slowest total first
+    with lock:
+        stages = [
+            (dict(labels).get("stage"), value["count"], value["sum"])
+            for (name, labels), value in histograms.items()
+            if name == "stage_seconds"
+        ]
+    return [
+        {
+            "stage": stage,
+            "count": n,
+            "total_ms": total * 1000,
+            "mean_ms": total / n * 1000,
+        }
+        for stage, n, total in sorted(stages, key=lambda item: -item[2])
+    ]
+
+
+def reset():
+    with lock:
+        counters.clear()
+        histograms.clear()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+
+def start_http_server(port=9108, host="127.0.0.1"):
+    """
+    Serves render() at http://host:port/metrics on a background thread.
+    """
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"Metrics are served on http://{host}:{server.server_port}/metrics")
+    return server
+
+
+def add_arguments(parser):
+    parser.add_argument("--metrics-file", help="append spans to this JSON lines file")
+    parser.add_argument(
+        "--metrics-port", type=int, help="serve Prometheus metrics on this port"
+    )
+
+
+def configure_from_args(args):
+    # Either option turns recording on
+    if args.metrics_file or args.metrics_port:
+        configure(True, args.metrics_file)
+    if args.metrics_port:
+        return start_http_server(args.metrics_port)
+    return None
+
+
+if EXPORT_FILE:
+    configure(True, EXPORT_FILE)
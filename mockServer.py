@@ -0,0 +1,283 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import Counter
+from string import Template
+from urllib.parse import parse_qs, urlparse
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+import syntheticPages
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+COLLEGES = [
+    ("BMC01", "Borough of Manhattan CC"),
+    ("HTR01", "Hunter College"),
+    ("JJC01", "John Jay College"),
+    ("YRK01", "York College"),
+]
+TERMS = [("2024 Spring Term", "1242")]
+SUBJECTS = [("Law", "LAW"), ("Physics", "PHYS"), ("Spanish", "SPAN")]
+CAREERS = [("Graduate", "GRAD"), ("Undergraduate", "UGRD")]
+
+# Page templates; a --templates folder can replace any of them with a file
+# of the same name
+TEMPLATES = {
+    "search.html": Template("""<html><body>
+<form name="searchform" action="CFSearchToolController" method="post">
+<ul class="checkboxes">$colleges</ul>
+<select name="term_value"><option value="">--Select--</option>$terms</select>
+<input type="submit" name="next_btn" value="Next">
+</form>
+</body></html>"""),
+    "subject.html": Template("""<html><body>
+<form name="searchform" action="CFSearchToolController" method="post">
+<select name="subject_name" id="subject_ld"><option value="">--Select--</option>$subjects</select>
+<select name="courseCareer" id="courseCareerId"><option value="">--Select--</option>$careers</select>
+<label class="switch"><input type="checkbox" name="open_class" value="O" checked><span class="slider"></span></label>
+<input type="submit" name="search_btn_search" value="Search">
+</form>
+</body></html>"""),
+}
+
+
+def render_options(options):
+    return "".join(
+        f'<option value="{value}">{text}</option>' for text, value in options
+    )
+
+
+def render_college_form(templates=TEMPLATES):
+    colleges = "".join(
+        f'<li><input type="checkbox" name="inst_selection" id="{code}" value="{code}">'
+        f'<label for="{code}">{name}</label></li>'
+        for code, name in COLLEGES
+    )
+    return templates["search.html"].substitute(
+        colleges=colleges, terms=render_options(TERMS)
+    )
+
+
+def render_subject_form(templates=TEMPLATES):
+    return templates["subject.html"].substitute(
+        subjects=render_options(SUBJECTS), careers=render_options(CAREERS)
+    )
+
+
+def load_templates(directory):
+    templates = dict(TEMPLATES)
+    for name in TEMPLATES:
+        file_name = os.path.join(directory, name)
+        if os.path.exists(file_name):
+            with open(file_name, "r", encoding="utf-8") as file:
+                templates[name] = Template(file.read())
+    return templates
+
+
+class SearchHandler(BaseHTTPRequestHandler):
+    """
+    Stands in for globalsearch.cuny.edu: serves the two search forms and a
+    results page for every search. Like the real site it keeps the chosen
+    college and term per JSESSIONID, so a search without them gets the
+    college form back.
+
+    results_html replays one saved page; without it each search gets a
+    synthetic page seeded by its college, term, subject and career.
+    latency/jitter are in seconds and error_rate is the share of requests
+    answered with error_status.
+    """
+
+    results_html = None
+    sections = 100
+    templates = TEMPLATES
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    error_status = 503
+    random = random.Random(0)
+    sessions = {}
+    stats = Counter()
+    lock = threading.Lock()
+
+    def send_html(self, html_content, status=200):
+        body = html_content.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if self.session_id() is None:
+            self.send_header("Set-Cookie", f"JSESSIONID={uuid.uuid4().hex}; Path=/")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def session_id(self):
+        for cookie in self.headers.get("Cookie", "").split(";"):
+            name, _, value = cookie.strip().partition("=")
+            if name == "JSESSIONID":
+                return value
+        return None
+
+    def delay_or_fail(self, kind):
+        # Returns True when this request was answered with an injected error
+        with self.lock:
+            self.stats[kind] += 1
+            delay = max(0.0, self.latency + self.random.uniform(-1, 1) * self.jitter)
+            fail = self.random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            with self.lock:
+                self.stats["errors"] += 1
+            self.send_html(
+                "<html><body>Service Unavailable</body></html>", self.error_status
+            )
+        return fail
+
+    def render_results(self, selection, subject, career):
+        if self.results_html is not None:
+            return self.results_html
+        seed = "_".join([*selection, subject, career])
+        courses = syntheticPages.synthetic_courses(
+            self.sections, seed=seed, subjects=[subject]
+        )
+        return syntheticPages.render_results_html(courses, college=selection[0])
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path.endswith("/stats"):
+            with self.lock:
+                body = json.dumps(dict(self.stats))
+            self.send_html(body)
+        elif path.endswith("/search.jsp"):
+            if not self.delay_or_fail("search"):
+                self.send_html(render_college_form(self.templates))
+        else:
+            self.send_html("<html><body>Not found</body></html>", 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        fields = parse_qs(self.rfile.read(length).decode("utf-8"))
+        session_id = self.session_id()
+        if "next_btn" in fields:
+            if self.delay_or_fail("next"):
+                return
+            selection = (
+                fields.get("inst_selection", [""])[0],
+                fields.get("term_value", [""])[0],
+            )
+            if session_id:
+                with self.lock:
+                    self.sessions[session_id] = selection
+            self.send_html(render_subject_form(self.templates))
+        elif "search_btn_search" in fields:
+            if self.delay_or_fail("results"):
+                return
+            with self.lock:
+                selection = self.sessions.get(session_id)
+            if selection is None:
+                # The search session is gone, so start over like the real site
+                with self.lock:
+                    self.stats["expired"] += 1
+                self.send_html(render_college_form(self.templates))
+                return
+            self.send_html(
+                self.render_results(
+                    selection,
+                    fields.get("subject_name", [""])[0],
+                    fields.get("courseCareer", [""])[0],
+                )
+            )
+        else:
+            self.send_html("<html><body>Bad request</body></html>", 400)
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+
+def make_handler(results_html=None, templates=None, **settings):
+    attributes = {
+        "results_html": results_html,
+        "templates": templates or TEMPLATES,
+        "random": random.Random(settings.pop("seed", 0)),
+        "sessions": {},
+        "stats": Counter(),
+        "lock": threading.Lock(),
+    }
+    attributes.update(settings)
+    return type("MockHandler", (SearchHandler,), attributes)
+
+
+def start_server(results_html=None, host="127.0.0.1", port=0, **settings):
+    """
+    Starts the stand-in server on a background thread and returns it. The
+    base url to scrape is f"http://{host}:{server.server_port}/CFGlobalSearchTool/".
+    Settings are the SearchHandler attributes: sections, templates, latency,
+    jitter, error_rate, error_status and seed.
+    """
+    handler = make_handler(results_html, **settings)
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def base_url(server):
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/CFGlobalSearchTool/"
+
+
+def add_arguments(parser):
+    parser.add_argument("--sections", type=int, default=100, help="per results page")
+    parser.add_argument("--templates", help="folder with search.html/subject.html")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds, +/-")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="0 to 1")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def settings_from_args(args):
+    return {
+        "sections": args.sections,
+        "templates": load_templates(args.templates) if args.templates else None,
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "error_rate": args.error_rate,
+        "error_status": args.error_status,
+        "seed": args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local CUNY Global Search stand-in")
+    parser.add_argument(
+        "results_file",
+        nargs="?",
+        help="saved results page HTML to replay (default: synthetic pages)",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    results_html = None
+    if args.results_file:
+        with open(args.results_file, "r", encoding="utf-8") as file:
+            results_html = file.read()
+
+    handler = make_handler(results_html, **settings_from_args(args))
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    logging.info(
+        f"Serving on http://{args.host}:{args.port}/CFGlobalSearchTool/search.jsp"
+    )
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,29 @@
 from playwright.async_api import async_playwright, Playwright
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from collections import defaultdict
+from urllib.parse import urljoin
+import argparse
 import asyncio
 import aioconsole
-from bs4 import BeautifulSoup
+import contextlib
 import csv, json
 import datetime
+import time
 import os
 import logging
 import preferences
+import courseParser
+import courseWriter
+import courseDatabase
+import columnarStore
+import snapshotStore
+import catalogCache
+import metrics
+import parsePipeline
+import requestFilter
+import resultCache
+import retryPolicy
+from catalogCache import catalog
 
 
 # Configure logging
@@ -14,23 +31,51 @@ logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-
-async def is_data_recent(filename, age_limit_days=7):
-    if not os.path.exists(filename):
-        return False
-
-    file_modified_time = datetime.datetime.fromtimestamp(os.path.getmtime(filename))
-    days_it_has_been = (datetime.datetime.now() - file_modified_time).days
-    logging.info(f"{filename} file is {days_it_has_been} days old.")
-
-    if days_it_has_been > age_limit_days:
-        logging.info(
-            f"File {filename} is older than {age_limit_days} days, deleting it."
-        )
-        os.remove(filename)
-        return False
-
-    return True
+# The search tool every scraper talks to. CUNY_BASE_URL (or set_base_url)
+# points them all at another copy of the site, such as mockServer.py.
+BASE_URL = os.environ.get(
+    "CUNY_BASE_URL", "https://globalsearch.cuny.edu/CFGlobalSearchTool/"
+)
+SEARCH_PAGE = "search.jsp"
+SEARCH_URL = urljoin(BASE_URL.rstrip("/") + "/", SEARCH_PAGE)
+
+# Where save_course_data writes each scrape: full "json" and "csv" files,
+# "stream" (CSV plus newline-delimited JSON written in one pass), the
+# "snapshot" store that keeps only changed rows, the "sqlite" database
+# (courseDatabase.py) that sectionIndex.py searches, and/or the optional
+# "columnar" files (columnarStore.py)
+OUTPUTS = ["json", "csv", "snapshot", "sqlite"]
+
+# Milliseconds each step may take before the scrape fails instead of reading
+# a half-loaded page
+STEP_TIMEOUT = 15000
+# Set on the old document before a submit, so a readiness check can never be
+# satisfied by the page that is being left
+MARK_PAGE = "window.__scrapeStale = true"
+SUBJECT_FORM_READY = """() => {
+    if (window.__scrapeStale) return false;
+    const subjects = document.querySelector("#subject_ld");
+    return !!subjects && subjects.options.length > 1;
+}"""
+# Ready once loading is done and the number of classinfo tables held still
+# between two polls; a search without classes settles at zero
+RESULTS_READY = """() => {
+    if (window.__scrapeStale || document.readyState !== "complete") return false;
+    const count = document.querySelectorAll("table.classinfo").length;
+    const previous = window.__classinfoCount;
+    window.__classinfoCount = count;
+    return count === previous;
+}"""
+
+# Running count, total and max milliseconds of each step in this process;
+# fixed size, so long-running daemons and watchers do not grow it
+step_times = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+
+
+def set_base_url(base_url):
+    global BASE_URL, SEARCH_URL
+    BASE_URL = base_url.rstrip("/") + "/"
+    SEARCH_URL = urljoin(BASE_URL, SEARCH_PAGE)
 
 
 def create_directory(directory):
@@ -77,7 +122,7 @@ async def save_data_to_json(
         "json",
     )
 
-    with open(file_name, "w", encoding="utf-8") as json_file:
+    with courseWriter.atomic_open(file_name) as json_file:
         json.dump(data, json_file, indent=4)
     logging.info(f"JSON file has been saved: {file_name}")
 
@@ -107,37 +152,178 @@ async def save_data_to_csv(
         "csv",
     )
 
-    with open(file_name, "w", newline="", encoding="utf-8") as file:
+    with courseWriter.atomic_open(file_name, newline="") as file:
         writer = csv.writer(file)
-        writer.writerow(
-            [
-                "Course Name",
-                "Class",
-                "Section",
-                "Days & Times",
-                "Room",
-                "Instructor",
-                "Instruction Mode",
-                "Meeting Dates",
-                "Status",
-            ]
+        writer.writerow(courseWriter.CSV_HEADER)
+        for course_name, class_info in courseWriter.iter_records(data):
+            writer.writerow(courseWriter.csv_row(course_name, class_info))
+    logging.info(f"CSV file has been saved: {file_name}")
+
+
+async def save_course_stream(
+    records,
+    collegeName,
+    selected_collegeCode,
+    term_selected,
+    subjectName,
+    whichCareer,
+    current_date=None,
+):
+    # One pass over the records writes both the CSV and the NDJSON file
+    folder = "collegeCourseData"
+    current_date = current_date or datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    file_names = []
+    for folderType, extension in (("csvFiles", "csv"), ("jsonFiles", "jsonl")):
+        create_directory(os.path.join(folder, folderType, collegeName))
+        file_names.append(
+            generate_file_name(
+                folder,
+                folderType,
+                collegeName,
+                selected_collegeCode,
+                term_selected,
+                subjectName,
+                whichCareer,
+                current_date,
+                extension,
+            )
         )
-        for course in data:
-            for class_info in course["classes"]:
-                writer.writerow(
-                    [
-                        course["course_name"],
-                        class_info["class"],
-                        class_info["section"],
-                        class_info["days_times"],
-                        class_info["room"],
-                        class_info["instructor"],
-                        class_info["instruction_mode"],
-                        class_info["meeting_dates"],
-                        class_info["status"],
-                    ]
+
+    count = courseWriter.write_course_records(records, *file_names)
+    logging.info(f"{count} rows have been streamed to: {', '.join(file_names)}")
+    return count
+
+
+async def stream_course_html(
+    html_content,
+    collegeName,
+    selected_collegeCode,
+    term_selected,
+    subjectName,
+    whichCareer,
+):
+    # Rows go from the parser straight to disk without building the course list
+    return await save_course_stream(
+        courseParser.iter_course_results(html_content),
+        collegeName,
+        selected_collegeCode,
+        term_selected,
+        subjectName,
+        whichCareer,
+    )
+
+
+async def save_course_data(
+    data,
+    collegeName,
+    selected_collegeCode,
+    term_selected,
+    subjectName,
+    whichCareer,
+    outputs=None,
+):
+    outputs = OUTPUTS if outputs is None else outputs
+    current_date = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    if "json" in outputs:
+        with timed_step("save json"):
+            await save_data_to_json(
+                data,
+                collegeName,
+                selected_collegeCode,
+                term_selected,
+                subjectName,
+                whichCareer,
+                current_date,
+            )
+    # "stream" already writes the CSV file
+    if "csv" in outputs and "stream" not in outputs:
+        with timed_step("save csv"):
+            await save_data_to_csv(
+                data,
+                collegeName,
+                selected_collegeCode,
+                term_selected,
+                subjectName,
+                whichCareer,
+                current_date,
+            )
+    if "stream" in outputs:
+        with timed_step("save stream"):
+            await save_course_stream(
+                courseWriter.iter_records(data),
+                collegeName,
+                selected_collegeCode,
+                term_selected,
+                subjectName,
+                whichCareer,
+                current_date,
+            )
+    if "columnar" in outputs:
+        with timed_step("save columnar"):
+            columnarStore.save_columnar(
+                data,
+                collegeName,
+                selected_collegeCode,
+                term_selected,
+                subjectName,
+                whichCareer,
+                current_date,
+            )
+    if "sqlite" in outputs:
+        with timed_step("save sqlite"):
+            courseDatabase.save_courses(
+                data,
+                collegeName,
+                selected_collegeCode,
+                term_selected,
+                subjectName,
+                whichCareer,
+            )
+    if "snapshot" in outputs:
+        with timed_step("save snapshot"):
+            # Only rows that changed since the last scrape are stored
+            transitions = snapshotStore.record_snapshot(
+                data,
+                collegeName,
+                selected_collegeCode,
+                term_selected,
+                subjectName,
+                whichCareer,
+            )
+            for event in transitions:
+                logging.info(
+                    f"{event['class']} {event['course_name']}: "
+                    f"{event['from']} -> {event['to']}"
                 )
-    logging.info(f"CSV file has been saved: {file_name}")
+
+
+@contextlib.contextmanager
+def timed_step(name):
+    # Logged at debug level, summed in step_times and, when enabled, recorded
+    # as a metrics span
+    start = time.time()
+    started = time.perf_counter()
+    try:
+        yield
+    except PlaywrightTimeoutError as e:
+        raise TimeoutError(f"Step '{name}' was not ready in time: {e}") from e
+    finally:
+        elapsed = time.perf_counter() - started
+        times = step_times[name]
+        times["count"] += 1
+        times["total_ms"] += elapsed * 1000
+        times["max_ms"] = max(times["max_ms"], elapsed * 1000)
+        metrics.record_span(name, start, elapsed)
+        logging.debug(f"Step '{name}' took {elapsed * 1000:.0f} ms")
+
+
+async def submit(page, button_name):
+    await page.evaluate(MARK_PAGE)
+    await page.get_by_role("button", name=button_name).click()
+
+
+async def wait_until_ready(page, ready):
+    await page.wait_for_function(ready, polling=50, timeout=STEP_TIMEOUT)
 
 
 async def select_college_and_term(page, user_preferences):
@@ -149,98 +335,87 @@ async def select_college_and_term(page, user_preferences):
     term_index = user_preferences.get("term_index") if user_preferences else -1
     term_selected = user_preferences.get("term_selected") if user_preferences else None
 
-    # Define paths and filenames
-    collegeDataList_path = "CollegeDataList"
-    collegeNTerm_data_file = "collegeNTerm_data.json"
-
-    # Create directories if they don't exist
-    create_directory(collegeDataList_path)
-
-    # Join paths correctly
-    college_data_file = os.path.join(collegeDataList_path, collegeNTerm_data_file)
+    college_data_file = catalogCache.COLLEGE_FILE
 
-    # Try to load existing data
-    collegeNTermData = await preferences.load_data(college_data_file)
+    # Navigate to the page, unless a warm page is already waiting on it
+    if page.url != SEARCH_URL:
+        logging.info("Navigating to the CUNY search page...")
 
-    # Navigate to the page
-    logging.info("Navigating to the CUNY search page...")
-    await page.goto("https://globalsearch.cuny.edu/CFGlobalSearchTool/search.jsp")
-
-    # Extract college names
-    # Check if the college data is recent and use it if so
-    college_checkboxes = await page.query_selector_all(
-        "ul.checkboxes input[type='checkbox']"
-    )
+        # Not retried here: SearchSession.fetch retries the whole walk
+        with timed_step("search page"):
+            await page.goto(SEARCH_URL, wait_until="domcontentloaded")
+            await page.wait_for_selector(
+                "ul.checkboxes input", state="attached", timeout=STEP_TIMEOUT
+            )
 
-    if await is_data_recent(college_data_file) and "CollegeList" in collegeNTermData:
-        colleges = collegeNTermData.get("CollegeList", [])
-    else:
-        # Scrape college data
-        colleges = [
-            (await checkbox.text_content()).strip() for checkbox in college_checkboxes
-        ]
+    # Use the cached catalog even when stale; it is refreshed in the background
+    colleges, colleges_fresh = await catalog.get(college_data_file, "CollegeList")
+    college_codes, codes_fresh = await catalog.get(college_data_file, "CollegeCodes")
+    terms, terms_fresh = await catalog.get(college_data_file, "TermList")
+
+    if colleges is None or college_codes is None or terms is None:
+        # Nothing cached yet, so read the catalog from this page once
+        collegeNTermData = await catalogCache.scrape_college_catalog(page)
+        catalog.put(college_data_file, **collegeNTermData)
+        colleges = collegeNTermData["CollegeList"]
+        college_codes = collegeNTermData["CollegeCodes"]
+        terms = collegeNTermData["TermList"]
+    elif not (colleges_fresh and codes_fresh and terms_fresh):
+        browser = page.context.browser
+        catalog.refresh_in_background(
+            college_data_file,
+            lambda: catalogCache.refresh_college_catalog(browser, SEARCH_URL),
+        )
 
     if collegeName is None:
         # Display colleges and ask user to select
         for index, college in enumerate(colleges, start=1):
             logging.info(f"{index}. {college}")
 
-    if selected_index < 0:
+    if selected_index < 0 and selected_college_code in college_codes:
+        # Resolve the index from the cached codes so no prompt is needed
+        selected_index = college_codes.index(selected_college_code)
+
+    # Only ask when no college code was given; a code the cached list does
+    # not know yet is looked up on the page instead
+    if selected_index < 0 and selected_college_code is None:
         selected_index = (
             int(await aioconsole.ainput("Select a college by entering its number: "))
             - 1
         )
 
-    college_name = (
-        "".join(colleges[selected_index].split())
-        if collegeName is None
-        else collegeName
-    )
+    college_name = collegeName
+    if college_name is None and selected_index >= 0:
+        college_name = "".join(colleges[selected_index].split())
     if selected_college_code is None and selected_index >= 0:
-        selected_college_code = await college_checkboxes[selected_index].get_attribute(
-            "id"
-        )
+        selected_college_code = college_codes[selected_index]
 
     # Find and click the corresponding checkbox
     checkbox = await page.query_selector(f"label[for='{selected_college_code}']")
     if not checkbox:
         logging.error("Selected college not found.")
         return None, None
+    if college_name is None:
+        college_name = "".join((await checkbox.inner_text()).split())
 
     await checkbox.click()
 
     term_select = await page.query_selector("select[name='term_value']")
-
-    # Check if the college data is recent and use it if so
-    if await is_data_recent(college_data_file) and "TermList" in collegeNTermData:
-        terms = collegeNTermData.get("TermList", [])
-    else:
-        # Extract terms
-        if term_select is None:
-            logging.error("Term select element not found.")
-            return None, None
-        # Scrape terms data
-        college_checkboxes = await page.query_selector_all(
-            "ul.checkboxes input[type='checkbox']"
-        )
-        terms = [
-            (
-                (await option.text_content()).strip(),
-                await option.get_attribute("value"),
-            )
-            for option in await term_select.query_selector_all("option")
-            if await option.get_attribute("value")
-        ]
-        # Save file for faster use
-        collegeNTermData = {"CollegeList": colleges, "TermList": terms}
-        await preferences.save_data(college_data_file, collegeNTermData)
+    if term_select is None:
+        logging.error("Term select element not found.")
+        return None, None
 
     if collegeName is None:
         # Display terms and ask user to select
         for index, term in enumerate(terms, start=1):
             logging.info(f"{index}. {term[0]}")
 
-    if term_index < 0:
+    if term_index < 0 and term_selected is not None:
+        term_values = [term[1] for term in terms]
+        if term_selected in term_values:
+            term_index = term_values.index(term_selected)
+
+    if term_index < 0 and term_selected is None:
         term_index = (
             int(await aioconsole.ainput("Select a term by entering its number: ")) - 1
         )
@@ -249,7 +424,10 @@ async def select_college_and_term(page, user_preferences):
 
     await term_select.select_option(term_selected)
 
-    await page.get_by_role("button", name="Next").click()
+    # Wait until the subject list is filled in, not just until the click
+    with timed_step("college and term"):
+        await submit(page, "Next")
+        await wait_until_ready(page, SUBJECT_FORM_READY)
 
     return [
         college_name,
@@ -260,30 +438,15 @@ async def select_college_and_term(page, user_preferences):
     ]
 
 
-async def select_subject_and_career(page, collegeName, user_preferences):
+async def select_subject_and_career(
+    page, collegeName, user_preferences, college_code=None, term=None
+):
     subject_name = user_preferences.get("subjectName") if user_preferences else None
     subject_index = user_preferences.get("subject_index") if user_preferences else -1
     which_career = user_preferences.get("whichCareer") if user_preferences else None
     career_index = user_preferences.get("career_index") if user_preferences else -1
 
-    # Define paths and filenames
-    collegeName_path = collegeName
-    collegeDataList_path = "CollegeDataList"
-    subjectNCareer_data_file = "subjectNCareer_data.json"
-
-    # Create directories if they don't exist
-    create_directory(os.path.join(collegeDataList_path, collegeName_path))
-
-    # Join paths correctly
-    subject_data_file = os.path.join(
-        collegeDataList_path, collegeName_path, subjectNCareer_data_file
-    )
-
-    # Try to load existing data
-    subjectNCareerData = await preferences.load_data(subject_data_file)
-
-    if subjectNCareerData is None:
-        subjectNCareerData = {}
+    subject_data_file = catalogCache.subject_file(collegeName)
 
     # Process for subjects
     subject_select = await page.query_selector("#subject_ld")
@@ -296,23 +459,40 @@ async def select_subject_and_career(page, collegeName, user_preferences):
             None,
         )
 
-    if await is_data_recent(subject_data_file) and "SubjectList" in subjectNCareerData:
-        logging.info(f"Using cached subject data.")
-        subjects = subjectNCareerData.get("SubjectList", [])
-    else:
-        subjects = [
-            (await option.text_content().strip(), await option.get_attribute("value"))
-            for option in await subject_select.query_selector_all("option")
-            if await option.get_attribute("value")
-        ]
-        subjectNCareerData["SubjectList"] = subjects
+    subjects, subjects_fresh = await catalog.get(subject_data_file, "SubjectList")
+    careers, careers_fresh = await catalog.get(subject_data_file, "CareerList")
+
+    if (
+        subjects is None
+        or careers is None
+        or (not (subjects_fresh and careers_fresh) and college_code is None)
+    ):
+        # This page already shows the lists, so read them here
+        subjectNCareerData = await catalogCache.scrape_subject_catalog(page)
+        catalog.put(subject_data_file, **subjectNCareerData)
+        subjects = subjectNCareerData["SubjectList"]
+        careers = subjectNCareerData["CareerList"]
+    elif not (subjects_fresh and careers_fresh):
+        logging.info("Using cached subject and career data while it refreshes.")
+        browser = page.context.browser
+        catalog.refresh_in_background(
+            subject_data_file,
+            lambda: catalogCache.refresh_subject_catalog(
+                browser, SEARCH_URL, college_code, term
+            ),
+        )
 
     if subject_name is None:
         # Display subjects and ask user to select
         for index, subject in enumerate(subjects, start=1):
             logging.info(f"{index}. {subject[0]}")
 
-    if subject_index < 0:
+    if subject_index < 0 and subject_name is not None:
+        subject_values = [subject[1] for subject in subjects]
+        if subject_name in subject_values:
+            subject_index = subject_values.index(subject_name)
+
+    if subject_index < 0 and subject_name is None:
         subject_index = (
             int(await aioconsole.ainput("Select a subject by entering its number: "))
             - 1
@@ -327,25 +507,17 @@ async def select_subject_and_career(page, collegeName, user_preferences):
         logging.error("Course career select element not found.")
         return None, None, None, None
 
-    if await is_data_recent(subject_data_file) and "CareerList" in subjectNCareerData:
-        logging.info(f"Using cached career data.")
-        careers = subjectNCareerData.get("CareerList", [])
-    else:
-        careers = [
-            (await option.text_content().strip(), await option.get_attribute("value"))
-            for option in await course_career_select.query_selector_all("option")
-            if await option.get_attribute("value")
-        ]
-        subjectNCareerData["CareerList"] = careers
-        # Save the updated data
-        await preferences.save_data(subject_data_file, subjectNCareerData)
-
     if which_career is None:
         # Display careers and ask user to select
         for index, career in enumerate(careers, start=1):
             logging.info(f"{index}. {career[0]}")
 
-    if career_index < 0:
+    if career_index < 0 and which_career is not None:
+        career_values = [career[1] for career in careers]
+        if which_career in career_values:
+            career_index = career_values.index(which_career)
+
+    if career_index < 0 and which_career is None:
         career_index = (
             int(
                 await aioconsole.ainput(
@@ -359,81 +531,53 @@ async def select_subject_and_career(page, collegeName, user_preferences):
         which_career = careers[career_index][1]
     await course_career_select.select_option(which_career)
 
-    # Turn off show only open button
-    await page.locator(".slider").first.click()
-    # Click the search button
-    await page.get_by_role("button", name="Search").click()
+    # Turn off show only open button. A form restored by going back keeps
+    # the earlier choice, so only click when it is still on.
+    open_only = page.locator("input[name='open_class']")
+    if not await open_only.count() or await open_only.first.is_checked():
+        await page.locator(".slider").first.click()
+    # Click the search button and wait for the class tables to settle
+    with timed_step("search submit"):
+        await submit(page, "Search")
+    with timed_step("search wait"):
+        await wait_until_ready(page, RESULTS_READY)
 
     return [subject_name, subject_index, which_career, career_index]
 
 
-async def extract_course_data(page):
-    # Extract course names
-    course_name_elements = await page.query_selector_all(".testing_msg")
-    course_full_names = []
-
-    for element in course_name_elements:
-        span_element = await element.query_selector("span")
-        if span_element:
-            inner_text = await span_element.inner_text()
-            course_full_names.append(inner_text.strip())
-
-    # Get the HTML content of the page
-    html_content = await page.content()
-    # Parse the HTML content with BeautifulSoup
-    soup = BeautifulSoup(html_content, "html.parser")
-    # Find all tables with the class 'classinfo'
-    tables = soup.find_all("table", class_="classinfo")
-    combined_courses = []
-
-    for course_name, table in zip(course_full_names[2:], tables):
-        if table is None:
-            print("Table element not found for", course_name)
-            continue
-
-        classes = []
-        for tbody in table.find_all("tbody"):
-            class_row = tbody.find("tr")
-            if class_row:
-                cells = class_row.find_all("td")
-                status_img = cells[7].find("img") if len(cells) > 7 else None
-                status = status_img["title"] if status_img else "Unknown"
-
-                class_info = {
-                    "class": cells[0].get_text(strip=True),
-                    "section": cells[1].get_text(strip=True),
-                    "days_times": cells[2].get_text(strip=True),
-                    "room": cells[3].get_text(strip=True),
-                    "instructor": cells[4].get_text(strip=True),
-                    "instruction_mode": cells[5].get_text(strip=True),
-                    "meeting_dates": cells[6].get_text(strip=True),
-                    "status": status,
-                }
-                classes.append(class_info)
-
-        course_data = {"course_name": course_name, "classes": classes}
-        combined_courses.append(course_data)
-
+def parse_course_html(html_content):
+    with timed_step("parse"):
+        combined_courses = courseParser.parse_course_results(html_content)
+    metrics.count(
+        "rows_parsed", sum(len(course["classes"]) for course in combined_courses)
+    )
     return combined_courses
 
 
+async def extract_course_data(page):
+    # Take one snapshot of the page and parse names and tables from it together
+    with timed_step("page content"):
+        html_content = await page.content()
+    metrics.observe("html_bytes", len(html_content))
+    return parse_course_html(html_content)
+
+
 async def run(playwright: Playwright) -> None:
+    browser = None
+    context = None
     try:
         user_preferences = preferences.load_preferences("userPreference.json")
-        collegeName = None
         selected_index = -1
-        selected_collegeCode = None
         term_index = -1
-        term_selected = None
-        subjectName = None
         subject_index = -1
-        whichCareer = None
         career_index = -1
         combined_courses = None
+        cached = False
 
         # Initialize Playwright browser and page
-        browser = await playwright.chromium.launch(headless=True)
-        context = await browser.new_context()
+        with timed_step("browser launch"):
+            browser = await playwright.chromium.launch(headless=True)
+        context = await requestFilter.new_context(browser)
         page = await context.new_page()
 
         if user_preferences is None:
@@ -449,60 +593,67 @@ async def run(playwright: Playwright) -> None:
                 subject_index,
                 whichCareer,
                 career_index,
-            ) = await select_subject_and_career(page, collegeName, user_preferences)
+            ) = await select_subject_and_career(
+                page, collegeName, user_preferences, selected_collegeCode, term_selected
+            )
+            with timed_step("page content"):
+                html_content = await page.content()
+            metrics.observe("html_bytes", len(html_content))
 
         else:
-            collegeName = user_preferences.get("collegeName")
-            selected_collegeCode = user_preferences.get("selected_collegeCode")
-            term_selected = user_preferences.get("term_selected")
-            subjectName = user_preferences.get("subjectName")
-            whichCareer = user_preferences.get("whichCareer")
-
+            # Every code is known, so a failed walk is retried without asking
+            session = SearchSession(page)
+            names, html_content = await session.fetch(user_preferences)
+            cached = session.from_cache
             (
                 collegeName,
-                selected_index,
                 selected_collegeCode,
-                term_index,
                 term_selected,
-            ) = await select_college_and_term(page, user_preferences)
-            logging.info("Selected College and Term")
-
-            (
                 subjectName,
-                subject_index,
                 whichCareer,
-                career_index,
-            ) = await select_subject_and_career(page, collegeName, user_preferences)
-            logging.info("Selected subject and career")
+            ) = names
+            selected_index = user_preferences.get("selected_index", -1)
+            term_index = user_preferences.get("term_index", -1)
+            subject_index = user_preferences.get("subject_index", -1)
+            career_index = user_preferences.get("career_index", -1)
+            logging.info("Selected college, term, subject and career")
 
         logging.info("Now extracting classes")
-        combined_courses = await extract_course_data(page)
+        if cached:
+            # Saving again would look like a new scrape of the same page
+            logging.info("Results page came from the result cache, not saving it")
+        elif OUTPUTS == ["stream"]:
+            # Nothing else needs the course list, so stream rows as they parse
+            with timed_step("parse and save stream"):
+                row_count = await stream_course_html(
+                    html_content,
+                    collegeName,
+                    selected_collegeCode,
+                    term_selected,
+                    subjectName,
+                    whichCareer,
+                )
+            metrics.count("rows_parsed", row_count)
+            if not row_count:
+                logging.error("No course data found.")
+                return
+        else:
+            combined_courses = parse_course_html(html_content)
 
-        if not combined_courses:
-            logging.error("No course data found.")
-            return
-
-        logging.info("saving data")
-        # Save data
-        current_date = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
-        await save_data_to_json(
-            combined_courses,
-            collegeName,
-            selected_collegeCode,
-            term_selected,
-            subjectName,
-            whichCareer,
-            current_date,
-        )
-        await save_data_to_csv(
-            combined_courses,
-            collegeName,
-            selected_collegeCode,
-            term_selected,
-            subjectName,
-            whichCareer,
-            current_date,
-        )
+            if not combined_courses:
+                logging.error("No course data found.")
+                return
+
+            logging.info("saving data")
+            # Save data
+            await save_course_data(
+                combined_courses,
+                collegeName,
+                selected_collegeCode,
+                term_selected,
+                subjectName,
+                whichCareer,
+            )
 
         # Save new preferences
         user_preferences = {
@@ -521,16 +672,390 @@ async def run(playwright: Playwright) -> None:
     except Exception as e:
         logging.error(f"An error occurred: {e}")
     finally:
-        if context:
+        # Let a background catalog refresh finish before the browser goes away
+        await catalog.wait_for_refreshes()
+        if requestFilter.LEAN:
+            logging.info(requestFilter.stats.summary())
+        for stage in metrics.summary():
+            logging.info(
+                f"{stage['stage']}: {stage['count']} x {stage['mean_ms']:.1f} ms"
+            )
+        # Either may be missing when the launch itself failed
+        if context is not None:
             await context.close()
-        if browser:
+        if browser is not None:
             await browser.close()
 
 
-async def main():
+def target_to_preferences(target):
+    """
+    Turns a (collegeCode, term, subject, career) target into the preference
+    dict understood by the selection helpers, so no prompt is shown.
+    """
+    if isinstance(target, dict):
+        college_code = target.get("collegeCode") or target.get("selected_collegeCode")
+        term = target.get("term") or target.get("term_selected")
+        subject = target.get("subject") or target.get("subjectName")
+        career = target.get("career") or target.get("whichCareer")
+        college_name = target.get("collegeName")
+    else:
+        college_code, term, subject, career = target
+        college_name = None
+
+    return {
+        "collegeName": college_name,
+        "selected_index": -1,
+        "selected_collegeCode": college_code,
+        "term_index": -1,
+        "term_selected": term,
+        "subjectName": subject,
+        "subject_index": -1,
+        "whichCareer": career,
+        "career_index": -1,
+    }
+
+
+class SearchSession:
+    """
+    Scrapes several subjects of one college and term on the same page. After
+    the first search it goes back to the subject/career form and changes only
+    the subject and career; a different college or term, or a form that did
+    not come back, takes the full walk from search.jsp.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        # (collegeName, collegeCode, term) of the subject form behind the results
+        self.selection = None
+        # Whether the last fetch was answered by resultCache
+        self.from_cache = False
+
+    async def back_to_subject_form(self):
+        try:
+            with timed_step("back to subject form"):
+                await self.page.go_back(wait_until="domcontentloaded")
+        except Exception as e:
+            logging.info(f"Could not go back to the subject form: {e}")
+            return False
+        return await self.page.query_selector("#subject_ld") is not None
+
+    async def start_over(self):
+        # Leave the half-done page, so the next try loads search.jsp afresh
+        self.selection = None
+        await self.page.goto("about:blank")
+
+    async def fetch(self, target, max_age=None):
+        """
+        Walks the forms for target and returns its names (collegeName,
+        collegeCode, term, subject, career) and the results page HTML. A walk
+        that times out or hits a network error is tried again from search.jsp.
+        With a max_age, or once resultCache.configure() turned the cache on,
+        a page fetched by any session of this process in the last max_age
+        seconds is served from resultCache instead.
+        """
+        user_preferences = target_to_preferences(target)
+        names, html_content, self.from_cache = await resultCache.cached_fetch(
+            resultCache.cache_key(SEARCH_URL, user_preferences),
+            lambda: self.fetch_uncached(target),
+            max_age,
+        )
+        return names, html_content
+
+    async def fetch_uncached(self, target):
+        try:
+            names, html_content = await retryPolicy.retry(
+                "scrape",
+                lambda: self.walk(target),
+                breaker=retryPolicy.breaker_for(SEARCH_URL),
+                on_retry=self.start_over,
+            )
+        except Exception:
+            metrics.count("scrapes", engine="browser", outcome="error")
+            raise
+        metrics.count("scrapes", engine="browser", outcome="ok")
+        metrics.observe("html_bytes", len(html_content))
+        return names, html_content
+
+    async def walk(self, target):
+        user_preferences = target_to_preferences(target)
+        key = (
+            user_preferences["selected_collegeCode"],
+            user_preferences["term_selected"],
+        )
+        try:
+            reuse = self.selection and self.selection[1:] == key
+            if reuse and not await self.back_to_subject_form():
+                metrics.count("retries", step="back to subject form")
+                reuse = False
+            if not reuse:
+                self.selection = None
+                selection = await select_college_and_term(self.page, user_preferences)
+                if selection[0] is None:
+                    raise ValueError(f"College or term not found for {target}")
+                self.selection = (selection[0], selection[2], selection[4])
+            collegeName, selected_collegeCode, term_selected = self.selection
+
+            selection = await select_subject_and_career(
+                self.page,
+                collegeName,
+                user_preferences,
+                selected_collegeCode,
+                term_selected,
+            )
+            if selection[0] is None:
+                raise ValueError(f"Subject or career not found for {target}")
+            subjectName, _, whichCareer, _ = selection
+
+            with timed_step("page content"):
+                html_content = await self.page.content()
+        except Exception:
+            # The page is in an unknown state, so the next scrape starts over
+            self.selection = None
+            raise
+        names = (
+            collegeName,
+            selected_collegeCode,
+            term_selected,
+            subjectName,
+            whichCareer,
+        )
+        return names, html_content
+
+    async def scrape(self, target, save=True, max_age=None):
+        names, html_content = await self.fetch(target, max_age)
+        combined_courses = parse_course_html(html_content)
+        if not combined_courses:
+            logging.warning(f"No course data found for {target}.")
+            return combined_courses
+
+        # A page from the cache was handled by the caller that fetched it
+        if save and not self.from_cache:
+            await save_course_data(combined_courses, *names)
+        return combined_courses
+
+
+async def scrape_target(page, target, save=True, max_age=None):
+    """
+    Runs the full form walk for one target on an already open page and
+    returns the extracted courses.
+    """
+    return await SearchSession(page).scrape(target, save, max_age)
+
+
+async def run_batch(
+    playwright: Playwright, targets, concurrency=4, save=True, processes=None
+):
+    """
+    Scrapes many targets in one browser. Up to `concurrency` contexts work
+    through the queue at once and a failing target only records its own error.
+    With `processes`, pages are parsed and saved in that many processes
+    (see parsePipeline.py) while the contexts go on fetching.
+    """
+    queue = asyncio.Queue()
+    for target in targets:
+        queue.put_nowait(target)
+    results = []
+    pending = []
+
+    async def worker(browser, pipeline):
+        context = await requestFilter.new_context(browser)
+        try:
+            page = await context.new_page()
+            # Targets of the same college and term reuse the subject form
+            session = SearchSession(page)
+            while True:
+                try:
+                    target = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    if pipeline is not None:
+                        names, html_content = await session.fetch(target)
+                        future = await pipeline.submit(
+                            html_content, names, save and not session.from_cache
+                        )
+                        pending.append((target, future))
+                        continue
+                    courses = await session.scrape(target, save=save)
+                    results.append(
+                        {"target": target, "courses": courses, "error": None}
+                    )
+                    logging.info(f"Scraped {target}: {len(courses)} courses")
+                except Exception as e:
+                    logging.error(f"An error occurred for {target}: {e}")
+                    results.append({"target": target, "courses": None, "error": str(e)})
+                    # Start the next target on a clean page
+                    await page.close()
+                    page = await context.new_page()
+                    session = SearchSession(page)
+        finally:
+            await context.close()
+
+    with timed_step("browser launch"):
+        browser = await playwright.chromium.launch(headless=True)
+    try:
+        workers = max(1, min(concurrency, len(targets)))
+        async with (
+            parsePipeline.ParsePipeline(processes)
+            if processes
+            else contextlib.nullcontext()
+        ) as pipeline:
+            await asyncio.gather(*(worker(browser, pipeline) for _ in range(workers)))
+            await parsePipeline.collect(pending, results)
+    finally:
+        await catalog.wait_for_refreshes()
+        await browser.close()
+    if requestFilter.LEAN:
+        logging.info(requestFilter.stats.summary())
+
+    return results
+
+
+async def run_targets(
+    targets, engine="browser", concurrency=4, save=True, processes=None, **options
+):
+    """
+    Scrapes the targets with the chosen engine: "browser" drives Chromium,
+    "http" posts the search forms directly (see httpScrap.py). `processes`
+    moves parsing and saving into a process pool.
+    """
+    if engine == "http":
+        import httpScrap
+
+        return await httpScrap.run_batch(
+            targets, concurrency, save, processes=processes, **options
+        )
+    if engine != "browser":
+        raise ValueError(f"Unknown engine: {engine}")
+
+    async with async_playwright() as playwright:
+        return await run_batch(playwright, targets, concurrency, save, processes)
+
+
+async def scrape(target, engine="browser", save=True, **options):
+    """
+    Scrapes one (collegeCode, term, subject, career) target without any
+    prompt. Returns {"target", "courses", "error"} like run_targets.
+    """
+    return (await run_targets([target], engine, 1, save, **options))[0]
+
+
+def load_targets(file_name):
+    """
+    Reads targets from a JSON list (of code lists or dicts) or from a text
+    file with one "collegeCode term subject career" per line.
+    """
+    with open(file_name, "r", encoding="utf-8") as file:
+        if file_name.endswith(".json"):
+            return json.load(file)
+        return [
+            line.split()
+            for line in file
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+
+
+def cli_targets(args):
+    # Every combination of the given codes, then the targets file
+    targets = [
+        [college, term, subject, career]
+        for college in args.college or []
+        for term in args.term or []
+        for subject in args.subject or []
+        for career in args.career
+    ]
+    if args.targets:
+        targets.extend(load_targets(args.targets))
+    if args.saved:
+        saved = preferences.load_preferences("userPreference.json", confirm=False)
+        if saved is None:
+            raise SystemExit("No saved preferences to scrape.")
+        targets.append(saved)
+    return targets
+
+
+async def interactive():
     async with async_playwright() as playwright:
         await run(playwright)
 
 
+def main():
+    parser = argparse.ArgumentParser(
+        description="Scrape CUNY Global Search. Without targets it asks for one."
+    )
+    parser.add_argument("--college", nargs="+", help="college codes, e.g. HTR01")
+    parser.add_argument("--term", nargs="+", help="term codes, e.g. 1242")
+    parser.add_argument("--subject", nargs="+", help="subject codes, e.g. SPAN")
+    parser.add_argument(
+        "--career", nargs="+", default=["UGRD"], help="career codes (default UGRD)"
+    )
+    parser.add_argument(
+        "--targets", help="JSON list or text file of 'college term subject career'"
+    )
+    parser.add_argument(
+        "--saved", action="store_true", help="scrape the saved preferences, no prompt"
+    )
+    parser.add_argument("--engine", choices=["browser", "http"], default="browser")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--processes",
+        type=int,
+        help="parse and save pages in this many processes (0: one per core)",
+    )
+    parser.add_argument("--no-save", action="store_true", help="only print results")
+    parser.add_argument(
+        "--json", action="store_true", help="print one JSON line per target"
+    )
+    parser.add_argument(
+        "--base-url", help="search tool to scrape, e.g. a local mockServer.py"
+    )
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=0,
+        help="reuse results pages fetched in the last this many seconds "
+        "(default 0: always fetch)",
+    )
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+    if args.base_url:
+        set_base_url(args.base_url)
+    resultCache.configure(args.max_age)
+
+    partial = [args.college, args.term, args.subject]
+    if any(partial) and not all(partial):
+        parser.error("--college, --term and --subject go together")
+    targets = cli_targets(args)
+    if not targets:
+        asyncio.run(interactive())
+        return
+
+    results = asyncio.run(
+        run_targets(
+            targets,
+            args.engine,
+            args.concurrency,
+            not args.no_save,
+            # 0 asks for the default of one process per core
+            None if args.processes is None else args.processes or os.cpu_count(),
+        )
+    )
+    for result in results:
+        if args.json:
+            print(json.dumps(result))
+        elif result["error"]:
+            logging.error(f"{result['target']}: {result['error']}")
+        else:
+            logging.info(f"{result['target']}: {len(result['courses'])} courses")
+    # Schedulers can tell a partly failed run from the exit status
+    if any(result["error"] for result in results):
+        raise SystemExit(1)
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    # httpScrap and the other modules import this file as officalScrap, so run
+    # that copy; settings such as set_base_url then reach all of them
+    import officalScrap
+
+    officalScrap.main()
@@ -0,0 +1,131 @@
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+import courseParser
+import metrics
+import officalScrap
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+# Pages waiting for a free process, per process, before fetchers have to wait
+PENDING_PER_PROCESS = 2
+
+
+def parse_and_save(html_content, names, save, outputs):
+    """
+    Runs in a worker process: parses one results page and, with save, writes
+    it like officalScrap.save_course_data. Returns the courses.
+    """
+    combined_courses = courseParser.parse_course_results(html_content)
+    if save and combined_courses:
+        # Nothing else runs in this process, so the save gets its own loop
+        asyncio.run(
+            officalScrap.save_course_data(combined_courses, *names, outputs=outputs)
+        )
+    return combined_courses
+
+
+class ParsePipeline:
+    """
+    Parses and saves fetched pages in a pool of processes, so parsing one
+    page never holds up the event loop that drives the other fetches.
+
+    submit() returns as soon as the page is queued and waits only while
+    `max_pending` pages are already queued; that backpressure keeps fast
+    fetchers from piling up HTML in memory.
+    """
+
+    def __init__(self, processes=None, max_pending=None):
+        self.processes = processes or os.cpu_count() or 1
+        self.max_pending = max_pending or self.processes * PENDING_PER_PROCESS
+        self.queue = None
+        self.executor = None
+        self.workers = []
+
+    async def __aenter__(self):
+        self.queue = asyncio.Queue(self.max_pending)
+        # Fresh interpreters rather than forks of a process with a browser
+        # connection and running threads
+        self.executor = ProcessPoolExecutor(
+            self.processes, mp_context=multiprocessing.get_context("spawn")
+        )
+        self.workers = [
+            asyncio.create_task(self.worker()) for _ in range(self.processes)
+        ]
+        return self
+
+    async def __aexit__(self, *exc_info):
+        for _ in self.workers:
+            await self.queue.put(None)
+        await asyncio.gather(*self.workers)
+        self.executor.shutdown()
+
+    async def worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                return
+            html_content, names, save, outputs, future, queued = item
+            metrics.observe(
+                "stage_seconds", time.perf_counter() - queued, stage="parse queue"
+            )
+            try:
+                with metrics.span("parse and save"):
+                    courses = await loop.run_in_executor(
+                        self.executor,
+                        parse_and_save,
+                        html_content,
+                        names,
+                        save,
+                        outputs,
+                    )
+                metrics.count(
+                    "rows_parsed", sum(len(course["classes"]) for course in courses)
+                )
+                future.set_result(courses)
+            except Exception as e:
+                future.set_exception(e)
+
+    async def submit(self, html_content, names, save=True):
+        """
+        Queues one page and returns a future of its courses. `names` are the
+        (collegeName, collegeCode, term, subject, career) from fetch().
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put(
+            (
+                html_content,
+                names,
+                save,
+                officalScrap.OUTPUTS,
+                future,
+                time.perf_counter(),
+            )
+        )
+        return future
+
+
+async def collect(pending, results):
+    """
+    Waits for the (target, future) pairs of a batch and appends their
+    results in the run_batch format.
+    """
+    for target, future in pending:
+        try:
+            courses = await future
+            results.append({"target": target, "courses": courses, "error": None})
+            if not courses:
+                logging.warning(f"No course data found for {target}.")
+            logging.info(f"Scraped {target}: {len(courses)} courses")
+        except Exception as e:
+            logging.error(f"An error occurred for {target}: {e}")
+            results.append({"target": target, "courses": None, "error": str(e)})
+    return results
@@ -14,11 +14,14 @@ def save_preferences(data, file_path):
     logging.info(f"User preference file has been saved: {file_path}")
 
 
-def load_preferences(file_path):
+def load_preferences(file_path, confirm=True):
     try:
         with open(file_path, "r", encoding="utf-8") as file:
             preferences = json.load(file)
 
+        if not confirm:
+            return preferences
+
         # Display current saved preferences
         logging.info("Current saved preferences:")
         for key, value in preferences.items():
@@ -0,0 +1,92 @@
+from collections import Counter
+from urllib.parse import urlparse
+import logging
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+# Set to False to let contexts load every asset again
+LEAN = True
+
+# Only the DOM is read; status icons are matched on their title attribute,
+# so none of these are needed
+BLOCKED_RESOURCE_TYPES = {"image", "stylesheet", "font", "media"}
+ANALYTICS_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "siteimproveanalytics.com",
+    "hotjar.com",
+)
+
+
+class RequestStats:
+    """
+    Counts blocked requests by resource type, plus the requests and bytes
+    that were let through. An aborted request never transfers anything, so
+    its size is unknown; the allowed bytes show what the lean pages cost.
+    """
+
+    def __init__(self):
+        self.blocked = Counter()
+        self.allowed = 0
+        self.allowed_bytes = 0
+
+    def summary(self):
+        blocked = ", ".join(
+            f"{count} {resource_type}"
+            for resource_type, count in self.blocked.most_common()
+        )
+        return (
+            f"Blocked {sum(self.blocked.values())} requests ({blocked or 'none'}); "
+            f"loaded {self.allowed} requests, {self.allowed_bytes:,} bytes"
+        )
+
+
+# Totals over every lean context of this process
+stats = RequestStats()
+
+
+def is_analytics(url):
+    host = urlparse(url).hostname or ""
+    return any(host == name or host.endswith("." + name) for name in ANALYTICS_HOSTS)
+
+
+async def install_lean_profile(context, request_stats=None):
+    """
+    Aborts image, stylesheet, font, media and analytics requests on every
+    page of the context.
+    """
+    request_stats = request_stats or stats
+
+    async def handle_route(route):
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES:
+            request_stats.blocked[request.resource_type] += 1
+            await route.abort()
+        elif is_analytics(request.url):
+            request_stats.blocked["analytics"] += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def count_response(response):
+        request_stats.allowed += 1
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            request_stats.allowed_bytes += int(length)
+
+    await context.route("**/*", handle_route)
+    context.on("response", count_response)
+    return request_stats
+
+
+async def new_context(browser, lean=None):
+    # Every scraping context is created here so the profile applies everywhere
+    context = await browser.new_context()
+    if LEAN if lean is None else lean:
+        await install_lean_profile(context)
+    return context
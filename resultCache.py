@@ -0,0 +1,230 @@
+from collections import Counter, OrderedDict
+from urllib.parse import urlparse
+import asyncio
+import json
+import logging
+import os
+import time
+import courseWriter
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+CACHE_ROOT = os.path.join("collegeCourseData", "resultCache")
+# Seconds a fetched results page is served without fetching again
+MAX_AGE = 60
+MAX_ENTRIES = 128
+# Bounds of the disk copy: files older than DISK_MAX_AGE seconds go first,
+# then the oldest until the folder holds at most DISK_MAX_BYTES
+DISK_MAX_AGE = 3600
+DISK_MAX_BYTES = 64 << 20
+# Stores between two prunes of the disk copy
+PRUNE_EVERY = 32
+
+
+def cache_key(base_url, user_preferences, open_only=False):
+    # The host is part of the key, so a stand-in server never answers for
+    # the real site; an open-only page never answers for the full one
+    host = urlparse(base_url).netloc.replace(":", "-")
+    parts = [
+        host,
+        user_preferences["selected_collegeCode"],
+        user_preferences["term_selected"],
+        user_preferences["subjectName"],
+        user_preferences["whichCareer"],
+    ]
+    if open_only:
+        parts.append("open")
+    return "_".join(parts)
+
+
+class ResultCache:
+    """
+    Fetch results keyed by site, college, term, subject and career. Recent
+    results are kept in memory up to `max_entries` (least recently used go
+    first) and on disk, so a restart or another process still finds them;
+    the disk copy is pruned to `disk_max_age` and `disk_max_bytes`.
+    Identical requests that arrive while a fetch is running wait for that
+    fetch instead of starting their own.
+    """
+
+    def __init__(
+        self,
+        max_age=MAX_AGE,
+        max_entries=MAX_ENTRIES,
+        root=CACHE_ROOT,
+        disk=True,
+        disk_max_age=DISK_MAX_AGE,
+        disk_max_bytes=DISK_MAX_BYTES,
+    ):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.root = root
+        self.disk = disk
+        self.disk_max_age = disk_max_age
+        self.disk_max_bytes = disk_max_bytes
+        self.entries = OrderedDict()
+        self.in_flight = {}
+        self.counts = Counter()
+        self.stores = 0
+
+    def file_name(self, key):
+        return os.path.join(self.root, f"{key}.json")
+
+    def remember(self, key, fetched, value):
+        self.entries[key] = (fetched, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.counts["evictions"] += 1
+
+    def lookup(self, key, max_age):
+        # Memory first, then the disk copy; None when neither is fresh enough
+        now = time.time()
+        if key in self.entries:
+            fetched, value = self.entries[key]
+            if now - fetched <= max_age:
+                self.entries.move_to_end(key)
+                self.counts["hits"] += 1
+                return value
+
+        if self.disk and os.path.exists(self.file_name(key)):
+            try:
+                with open(self.file_name(key), "r", encoding="utf-8") as file:
+                    entry = json.load(file)
+                fetched, value = entry["fetched"], entry["value"]
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"Ignoring unreadable cache file for {key}: {e}")
+                return None
+            if now - fetched <= max_age:
+                self.remember(key, fetched, value)
+                self.counts["disk_hits"] += 1
+                return value
+        return None
+
+    def store(self, key, value):
+        fetched = time.time()
+        self.remember(key, fetched, value)
+        if self.disk:
+            os.makedirs(self.root, exist_ok=True)
+            with courseWriter.atomic_open(self.file_name(key)) as file:
+                json.dump({"fetched": fetched, "value": value}, file)
+            self.stores += 1
+            if self.stores % PRUNE_EVERY == 1:
+                self.prune()
+
+    def prune(self, now=None):
+        """
+        Removes disk entries older than disk_max_age, then the oldest ones
+        until the folder holds at most disk_max_bytes. Returns the number of
+        files removed.
+        """
+        now = now or time.time()
+        files = []
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return 0
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Another process pruned it first
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for modified, size, path in sorted(files):
+            if now - modified <= self.disk_max_age and total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        self.counts["disk_evictions"] += removed
+        return removed
+
+    async def get(self, key, fetch, max_age=None):
+        """
+        Returns (value, fetched) for key, calling `await fetch()` only when no
+        value younger than max_age seconds is cached. `fetched` is True only
+        for the caller whose call ran the fetch.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        value = self.lookup(key, max_age)
+        if value is not None:
+            return value, False
+
+        if key in self.in_flight:
+            self.counts["coalesced"] += 1
+            fetched = False
+        else:
+            self.counts["misses"] += 1
+            fetched = True
+
+            async def fetch_and_store():
+                try:
+                    value = await fetch()
+                    self.store(key, value)
+                    return value
+                finally:
+                    self.in_flight.pop(key, None)
+
+            self.in_flight[key] = asyncio.create_task(fetch_and_store())
+        # A caller that gives up does not cancel the fetch the others wait on
+        return await asyncio.shield(self.in_flight[key]), fetched
+
+    def stats(self):
+        requests = sum(
+            self.counts[name] for name in ("hits", "disk_hits", "coalesced", "misses")
+        )
+        served = requests - self.counts["misses"]
+        return {
+            "entries": len(self.entries),
+            "requests": requests,
+            "hits": self.counts["hits"],
+            "disk_hits": self.counts["disk_hits"],
+            "coalesced": self.counts["coalesced"],
+            "misses": self.counts["misses"],
+            "evictions": self.counts["evictions"],
+            "disk_evictions": self.counts["disk_evictions"],
+            "hit_rate": served / requests if requests else 0.0,
+        }
+
+
+# The cache SearchSession.fetch goes through; off (None) until configure() or
+# a caller's max_age turns it on
+shared = None
+
+
+def configure(max_age=MAX_AGE, max_entries=MAX_ENTRIES, **options):
+    # Replaces the shared cache; a max_age of 0 turns caching off
+    global shared
+    shared = ResultCache(max_age, max_entries, **options) if max_age > 0 else None
+
+
+async def cached_fetch(key, fetch, max_age=None):
+    """
+    Returns (names, html, cached) of a results page. While the shared cache
+    is on, or when the caller passes a max_age, callers of this process
+    share one fetch per page and reuse recent ones; `cached` tells the
+    caller the page was fetched by someone else, so it should not be saved
+    again.
+    """
+    if shared is None and max_age:
+        configure()
+    if shared is None:
+        names, html_content = await fetch()
+        return names, html_content, False
+    (names, html_content), fetched = await shared.get(key, fetch, max_age)
+    # Entries read back from disk hold lists
+    return tuple(names), html_content, not fetched
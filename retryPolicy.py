@@ -0,0 +1,201 @@
+from collections import deque
+from playwright.async_api import Error as PlaywrightError
+from urllib.parse import urlparse
+import asyncio
+import logging
+import random
+import time
+import aiohttp
+import metrics
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+# Tries per step, and the backoff before each retry: a random delay of up
+# to BASE_DELAY * 2 ** retry seconds, never more than MAX_DELAY
+ATTEMPTS = 3
+BASE_DELAY = 0.5
+MAX_DELAY = 10.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# The breaker opens when FAILURE_RATE of the last WINDOW calls to a host
+# failed (once MIN_CALLS were made) and turns requests away for COOLDOWN
+# seconds
+WINDOW = 20
+MIN_CALLS = 5
+FAILURE_RATE = 0.5
+COOLDOWN = 30.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a host whose breaker is open."""
+
+    def __init__(self, host, remaining=None):
+        if remaining is None:
+            message = f"Requests to {host} wait for a probe call to finish"
+        else:
+            message = f"Requests to {host} are paused for another {remaining:.0f} s"
+        super().__init__(message)
+        self.host = host
+        self.remaining = remaining
+
+
+def is_retryable(error):
+    """
+    True for failures that another try may get past: timeouts, dropped
+    connections, 5xx/429 answers and browser network errors. Anything else,
+    such as an unknown college, fails right away.
+    """
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in RETRY_STATUSES
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    if isinstance(error, aiohttp.ClientConnectionError):
+        return True
+    if isinstance(error, PlaywrightError):
+        return "net::ERR" in str(error) or "Timeout" in str(error)
+    return False
+
+
+def backoff_delay(retry, base=BASE_DELAY, cap=MAX_DELAY):
+    # "Full jitter", so clients that failed together do not retry together
+    return random.uniform(0, min(cap, base * 2**retry))
+
+
+class CircuitBreaker:
+    """
+    Tracks recent outcomes of calls to one host. While it is open, acquire()
+    fails fast with CircuitOpenError instead of adding load to a failing
+    site; after the cooldown one probe call is let through, and its outcome
+    closes the breaker or opens it again.
+    """
+
+    def __init__(
+        self,
+        host,
+        window=WINDOW,
+        min_calls=MIN_CALLS,
+        failure_rate=FAILURE_RATE,
+        cooldown=COOLDOWN,
+    ):
+        self.host = host
+        self.outcomes = deque(maxlen=window)
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+
+    def acquire(self):
+        """
+        Returns True when the call about to be made is the half-open probe,
+        False for an ordinary call, and raises CircuitOpenError when no call
+        may be made now.
+        """
+        if self.state == CLOSED:
+            return False
+        if self.state == OPEN:
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if remaining > 0:
+                metrics.count("breaker_rejections", host=self.host)
+                raise CircuitOpenError(self.host, remaining)
+            self.state = HALF_OPEN
+            self.probing = False
+        if self.probing:
+            # Another caller's probe decides whether the host is back
+            metrics.count("breaker_rejections", host=self.host)
+            raise CircuitOpenError(self.host)
+        self.probing = True
+        return True
+
+    def release(self, probe):
+        # A probe that ended without an outcome (e.g. was cancelled) must not
+        # keep the breaker half-open forever
+        if probe and self.state == HALF_OPEN:
+            self.probing = False
+
+    def record(self, success):
+        if self.state == HALF_OPEN:
+            self.probing = False
+            if success:
+                logging.info(f"Requests to {self.host} are flowing again.")
+                self.state = CLOSED
+                self.outcomes.clear()
+            else:
+                self.trip()
+            return
+
+        self.outcomes.append(success)
+        failures = self.outcomes.count(False)
+        if (
+            self.state == CLOSED
+            and len(self.outcomes) >= self.min_calls
+            and failures / len(self.outcomes) >= self.failure_rate
+        ):
+            self.trip()
+
+    def trip(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        metrics.count("breaker_trips", host=self.host)
+        logging.warning(
+            f"Too many failures from {self.host}; pausing requests for "
+            f"{self.cooldown:.0f} s."
+        )
+
+
+breakers = {}
+
+
+def breaker_for(url):
+    # One breaker per host, shared by every engine and worker of the process
+    host = urlparse(url).netloc
+    if host not in breakers:
+        breakers[host] = CircuitBreaker(host, WINDOW, MIN_CALLS, FAILURE_RATE, COOLDOWN)
+    return breakers[host]
+
+
+async def retry(step, call, attempts=ATTEMPTS, breaker=None, on_retry=None):
+    """
+    Returns `await call()`, trying up to `attempts` times with jittered
+    exponential backoff while it fails with a retryable error. `on_retry`
+    is awaited before each new try, to put a page back in a known state.
+    An open breaker raises CircuitOpenError at once, without retries.
+    """
+    for attempt in range(attempts):
+        probe = breaker.acquire() if breaker else False
+        try:
+            result = await call()
+        except Exception as e:
+            retryable = is_retryable(e)
+            if breaker:
+                # Only failures of the site count against it
+                breaker.record(not retryable)
+            if not retryable or attempt == attempts - 1:
+                raise
+            error = e
+        else:
+            if breaker:
+                breaker.record(True)
+            return result
+        finally:
+            if breaker:
+                breaker.release(probe)
+
+        delay = backoff_delay(attempt)
+        metrics.count("retries", step=step)
+        logging.info(
+            f"Step '{step}' failed ({error}); try {attempt + 2} of {attempts} "
+            f"in {delay:.1f} s"
+        )
+        await asyncio.sleep(delay)
+        if on_retry:
+            await on_retry()
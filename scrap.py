@@ -1,5 +1,5 @@
 from playwright.sync_api import Playwright, sync_playwright, expect
-from bs4 import BeautifulSoup
+import courseParser
 import csv
 import datetime
 import os
@@ -147,49 +147,8 @@ def run(playwright: Playwright) -> None:
     # page.get_by_text("CSCI 274 - Computer Architecture").click()
     # page.locator("#imageDivLink7").click()
 
-    # Query all the div elements with the class "testing_msg" and extract course full names
-    course_name_elements = page.query_selector_all(".testing_msg")
-    course_full_names = [
-        element.query_selector("span").inner_text().strip()
-        for element in course_name_elements
-        if element
-    ]
-
-    # Get the HTML content of the page
-    html_content = page.content()
-    # Parse the HTML content with BeautifulSoup
-    soup = BeautifulSoup(html_content, "html.parser")
-    # Find all tables with the class 'classinfo'
-    tables = soup.find_all("table", class_="classinfo")
-    combined_courses = []
-
-    for course_name, table in zip(course_full_names[2:], tables):
-        if table is None:
-            print("Table element not found for", course_name)
-            continue
-
-        classes = []
-        for tbody in table.find_all("tbody"):
-            class_row = tbody.find("tr")
-            if class_row:
-                cells = class_row.find_all("td")
-                status_img = cells[7].find("img") if len(cells) > 7 else None
-                status = status_img["title"] if status_img else "Unknown"
-
-                class_info = {
-                    "class": cells[0].get_text(strip=True),
-                    "section": cells[1].get_text(strip=True),
-                    "days_times": cells[2].get_text(strip=True),
-                    "room": cells[3].get_text(strip=True),
-                    "instructor": cells[4].get_text(strip=True),
-                    "instruction_mode": cells[5].get_text(strip=True),
-                    "meeting_dates": cells[6].get_text(strip=True),
-                    "status": status,
-                }
-                classes.append(class_info)
-
-        course_data = {"course_name": course_name, "classes": classes}
-        combined_courses.append(course_data)
+    # Parse course names and class rows from the page HTML
+    combined_courses = courseParser.parse_course_results(page.content())
 
     current_date = datetime.datetime.now().strftime("%Y%m%d")
 
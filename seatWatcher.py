@@ -0,0 +1,316 @@
+from playwright.async_api import async_playwright
+import aiohttp
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import logging
+import random
+import browserDaemon
+import httpScrap
+import metrics
+import officalScrap
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+# Seconds between scrapes of one subject. A subject starts at BASE_INTERVAL,
+# drops to MIN_INTERVAL after any status change or inside a registration
+# window, and slows down by BACKOFF per quiet tick up to MAX_INTERVAL.
+MIN_INTERVAL = 60
+BASE_INTERVAL = 300
+MAX_INTERVAL = 1800
+BACKOFF = 1.5
+JITTER = 0.1
+# Oldest page fetched by another caller that a tick still accepts; kept under
+# the shortest jittered interval so every tick sees a newer page than the last
+CACHE_AGE = 30
+
+
+def load_watchlist(file_name):
+    """
+    Reads a JSON list of {"college", "term", "subject", "class"} entries,
+    with an optional "career" (UGRD by default).
+    """
+    with open(file_name, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def group_watchlist(watchlist):
+    # One scrape per subject serves every watched class in it
+    groups = {}
+    for entry in watchlist:
+        key = (
+            entry["college"],
+            entry["term"],
+            entry["subject"],
+            entry.get("career", "UGRD"),
+        )
+        groups.setdefault(key, set()).add(str(entry["class"]))
+    return groups
+
+
+def parse_window(text):
+    # "2024-11-01T08:00/2024-11-15T23:59" -> (start, end)
+    start, end = text.split("/")
+    return (
+        datetime.datetime.fromisoformat(start),
+        datetime.datetime.fromisoformat(end),
+    )
+
+
+class StdoutNotifier:
+    async def notify(self, event):
+        print(
+            f"{event['time']} {event['college']} {event['term']} "
+            f"{event['course_name']} class {event['class']}: "
+            f"{event['old']} -> {event['new']}",
+            flush=True,
+        )
+
+
+class FileNotifier:
+    # Appends one JSON line per transition
+    def __init__(self, file_name):
+        self.file_name = file_name
+
+    async def notify(self, event):
+        with open(self.file_name, "a", encoding="utf-8") as file:
+            file.write(json.dumps(event) + "\n")
+
+
+class WebhookNotifier:
+    # Posts each transition as JSON; a failed post is logged, not retried
+    def __init__(self, url):
+        self.url = url
+
+    async def notify(self, event):
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(self.url, json=event) as response:
+                    response.raise_for_status()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f"Webhook notification failed: {e}")
+
+
+class SubjectWatch:
+    """
+    Polling state of one (college, term, subject, career): the watched class
+    numbers, their last seen status and the current interval.
+    """
+
+    def __init__(self, key, classes):
+        self.key = key
+        self.classes = classes
+        self.statuses = {}
+        self.interval = BASE_INTERVAL
+
+    @property
+    def target(self):
+        return dict(zip(("collegeCode", "term", "subject", "career"), self.key))
+
+    def transitions(self, courses):
+        """
+        Updates the statuses from one scrape. Returns (events for watched
+        classes, whether any class in the subject changed status). A scrape
+        without courses (an empty or blocked page) keeps the last statuses.
+        """
+        if not courses:
+            return [], False
+        events = []
+        churn = False
+        time = datetime.datetime.now().isoformat(timespec="seconds")
+        seen = {}
+        for course in courses:
+            for class_info in course["classes"]:
+                number = class_info["class"]
+                seen[number] = class_info["status"]
+                old = self.statuses.get(number)
+                if old is None or old == class_info["status"]:
+                    continue
+                churn = True
+                if number in self.classes:
+                    events.append(
+                        {
+                            "time": time,
+                            "college": self.key[0],
+                            "term": self.key[1],
+                            "subject": self.key[2],
+                            "career": self.key[3],
+                            "class": number,
+                            "course_name": course["course_name"],
+                            "section": class_info["section"],
+                            "old": old,
+                            "new": class_info["status"],
+                        }
+                    )
+        missing = self.classes - set(seen)
+        if missing and not self.statuses:
+            logging.warning(
+                f"Watched classes not found in {' '.join(self.key)}: "
+                f"{', '.join(sorted(missing))}"
+            )
+        self.statuses = seen
+        return events, churn
+
+    def next_interval(self, churn, in_window, failed=False):
+        if churn or in_window:
+            self.interval = MIN_INTERVAL
+        else:
+            self.interval = min(MAX_INTERVAL, self.interval * BACKOFF)
+        if failed:
+            self.interval = min(MAX_INTERVAL, max(self.interval, BASE_INTERVAL) * 2)
+        return self.interval * random.uniform(1 - JITTER, 1 + JITTER)
+
+
+@contextlib.asynccontextmanager
+async def open_scraper(
+    engine="http", concurrency=2, base_url=None, cache_age=CACHE_AGE
+):
+    """
+    Yields scrape(target) for the chosen engine, keeping one browser or one
+    connection pool open for the life of the watcher. Pages fetched in the
+    last cache_age seconds are reused; 0 always fetches.
+    """
+    if engine == "http":
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        sessions = asyncio.Queue()
+        try:
+            for _ in range(concurrency):
+                session = aiohttp.ClientSession(
+                    connector=connector,
+                    connector_owner=False,
+                    cookie_jar=aiohttp.CookieJar(unsafe=True),
+                )
+                sessions.put_nowait(httpScrap.SearchSession(session, base_url))
+
+            async def scrape(target):
+                search = await sessions.get()
+                try:
+                    return await search.scrape(target, False, cache_age)
+                finally:
+                    sessions.put_nowait(search)
+
+            yield scrape
+        finally:
+            while not sessions.empty():
+                await sessions.get_nowait().session.close()
+            await connector.close()
+    else:
+        async with async_playwright() as playwright:
+            browser = await playwright.chromium.launch(headless=True)
+            pool = browserDaemon.ContextPool(browser, concurrency, reuse_forms=True)
+            try:
+                yield lambda target: pool.scrape(target, False, cache_age)
+            finally:
+                await pool.close()
+                await officalScrap.catalog.wait_for_refreshes()
+                await browser.close()
+
+
+class Watcher:
+    """
+    Watches a list of class numbers for status changes. Each subject is
+    scraped once per tick no matter how many of its classes are watched.
+    """
+
+    def __init__(self, watchlist, notifiers=None, windows=None):
+        self.watches = [
+            SubjectWatch(key, classes)
+            for key, classes in group_watchlist(watchlist).items()
+        ]
+        self.notifiers = notifiers or [StdoutNotifier()]
+        self.windows = windows or []
+
+    def in_window(self):
+        now = datetime.datetime.now()
+        return any(start <= now <= end for start, end in self.windows)
+
+    async def poll(self, watch, scrape):
+        try:
+            courses = await scrape(watch.target)
+        except Exception as e:
+            logging.error(f"Scrape failed for {' '.join(watch.key)}: {e}")
+            return watch.next_interval(False, self.in_window(), failed=True)
+
+        if not courses:
+            logging.warning(f"No courses found for {' '.join(watch.key)}")
+            return watch.next_interval(False, self.in_window(), failed=True)
+
+        baseline = not watch.statuses
+        events, churn = watch.transitions(courses)
+        for event in events:
+            for notifier in self.notifiers:
+                # One broken notifier must not stop the watch
+                try:
+                    await notifier.notify(event)
+                except Exception as e:
+                    logging.error(
+                        f"{type(notifier).__name__} failed for class "
+                        f"{event['class']}: {e}"
+                    )
+        if baseline:
+            watched = {
+                number: watch.statuses.get(number, "missing")
+                for number in sorted(watch.classes)
+            }
+            logging.info(f"Watching {' '.join(watch.key)}: {watched}")
+        return watch.next_interval(churn, self.in_window())
+
+    async def watch_subject(self, watch, scrape):
+        # Spread the first scrapes out a little instead of firing them at once
+        await asyncio.sleep(random.uniform(0, JITTER * MIN_INTERVAL))
+        while True:
+            delay = await self.poll(watch, scrape)
+            logging.info(f"Next check of {' '.join(watch.key)} in {delay:.0f} s")
+            await asyncio.sleep(delay)
+
+    async def run(self, engine="http", concurrency=2, **options):
+        async with open_scraper(engine, concurrency, **options) as scrape:
+            await asyncio.gather(
+                *(self.watch_subject(watch, scrape) for watch in self.watches)
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch classes for open seats")
+    parser.add_argument("watchlist", help="JSON file of watched classes")
+    parser.add_argument("--engine", choices=["browser", "http"], default="http")
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument(
+        "--window",
+        action="append",
+        default=[],
+        help="registration window START/END in ISO format; polls fastest inside it",
+    )
+    parser.add_argument("--log-file", help="also append transitions to this file")
+    parser.add_argument("--webhook", help="also post transitions to this url")
+    parser.add_argument(
+        "--base-url", help="search tool to scrape, e.g. a local mockServer.py"
+    )
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+    if args.base_url:
+        officalScrap.set_base_url(args.base_url)
+
+    notifiers = [StdoutNotifier()]
+    if args.log_file:
+        notifiers.append(FileNotifier(args.log_file))
+    if args.webhook:
+        notifiers.append(WebhookNotifier(args.webhook))
+
+    watcher = Watcher(
+        load_watchlist(args.watchlist),
+        notifiers,
+        [parse_window(window) for window in args.window],
+    )
+    asyncio.run(watcher.run(args.engine, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
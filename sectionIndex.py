@@ -0,0 +1,226 @@
+import argparse
+import json
+import logging
+import time
+import clean
+import courseDatabase
+import sectionQuery
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+# Searches the sections of courseDatabase. Every saved scrape keeps its
+# postings (words of the course name, instructor, room and mode) and parsed
+# days and times up to date; build() imports files saved before that.
+
+
+def group_courses(rows):
+    # Flat rows of a saved file -> the parser's course list
+    courses = {}
+    for row in rows:
+        course = courses.setdefault(
+            row["course_name"], {"course_name": row["course_name"], "classes": []}
+        )
+        course["classes"].append(
+            {field: row[field] for field in ["class", *courseDatabase.SECTION_FIELDS]}
+        )
+    return list(courses.values())
+
+
+def build(roots=None, database_file=None):
+    """
+    Saves the newest file of every series that the database has not seen
+    yet or has only seen older. Returns the number of series imported.
+    """
+    roots = roots or [
+        (sectionQuery.CSV_ROOT, "csv"),
+        (sectionQuery.JSON_ROOT, "json"),
+        (sectionQuery.JSON_ROOT, "jsonl"),
+    ]
+    newest = {}
+    for root, extension in roots:
+        for file_path in sectionQuery.latest_snapshot_files(root, extension):
+            info = sectionQuery.parse_file_name(file_path)
+            series = tuple(
+                info[part] for part in ("college", "code", "term", "subject", "career")
+            )
+            if series not in newest or info["timestamp"] > newest[series][0]:
+                newest[series] = (info["timestamp"], file_path)
+
+    known = {}
+    courseDatabase.ensure_schema(database_file)
+    connection = courseDatabase.connect(database_file)
+    try:
+        for row in connection.execute(
+            "SELECT college_code, term, subject, career, scraped FROM scrapes"
+        ):
+            known[tuple(row)[:4]] = row["scraped"]
+    finally:
+        connection.close()
+
+    imported = 0
+    for series, (timestamp, file_path) in sorted(newest.items()):
+        scraped = clean.parse_timestamp(timestamp).isoformat(timespec="seconds")
+        if known.get(series[1:], "") >= scraped:
+            continue
+        courseDatabase.save_courses(
+            group_courses(sectionQuery.read_rows(file_path)),
+            *series,
+            database_file=database_file,
+            updated=scraped,
+        )
+        imported += 1
+    return imported
+
+
+def search(
+    text=None,
+    instructor=None,
+    room=None,
+    mode=None,
+    days=None,
+    starts_after=None,
+    ends_before=None,
+    status=None,
+    college=None,
+    term=None,
+    subject=None,
+    limit=None,
+    database_file=None,
+):
+    """
+    Returns the listed sections matching every given filter, e.g.
+    search(instructor="smith", status="open") or
+    search(subject="CSCI", days="Tu", starts_after=sectionQuery.parse_clock("5PM")).
+    Word filters match whole words in any order. `days` ("TuTh") and the
+    times filter like sectionQuery.SectionTable.query: sections meeting on
+    any of the days.
+    """
+    tokens = [f"course:{word}" for word in courseDatabase.words(text)]
+    tokens += [f"instructor:{word}" for word in courseDatabase.words(instructor)]
+    tokens += [f"room:{word}" for word in courseDatabase.words(room)]
+    tokens += [f"mode:{word}" for word in courseDatabase.words(mode)]
+
+    query = (
+        "SELECT courses.college, courses.college_code, courses.term,"
+        " courses.subject, courses.career, courses.course_name, sections.*"
+        " FROM sections JOIN courses ON courses.id = sections.course_id"
+        " WHERE sections.dropped IS NULL"
+    )
+    parameters = []
+    if tokens:
+        # Each token's postings are a primary key range; their intersection
+        # is the candidate set
+        query += (
+            " AND sections.id IN ("
+            + " INTERSECT ".join(
+                "SELECT section_id FROM postings WHERE token = ?" for _ in tokens
+            )
+            + ")"
+        )
+        parameters += tokens
+    if days:
+        query += " AND (sections.day_mask & ?) != 0"
+        parameters.append(sectionQuery.parse_days_times(days)[0])
+    if starts_after is not None:
+        query += " AND sections.start_minute >= ?"
+        parameters.append(starts_after)
+    if ends_before is not None:
+        query += " AND sections.end_minute BETWEEN 0 AND ?"
+        parameters.append(ends_before)
+    if status:
+        query += " AND lower(sections.status) = ?"
+        parameters.append(status.lower())
+    for column, value in (
+        ("college_code", college),
+        ("term", term),
+        ("subject", subject),
+    ):
+        if value:
+            query += f" AND courses.{column} = ?"
+            parameters.append(value)
+    query += " ORDER BY courses.college_code, courses.term, courses.course_name"
+    if limit:
+        query += " LIMIT ?"
+        parameters.append(limit)
+
+    if not courseDatabase.exists(database_file):
+        return []
+    connection = courseDatabase.connect(database_file)
+    try:
+        return [dict(row) for row in connection.execute(query, parameters)]
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Search every scraped section across colleges and terms"
+    )
+    parser.add_argument("--database", default=courseDatabase.DATABASE_FILE)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser(
+        "build", help="import saved files that are newer than the database"
+    )
+
+    search_parser = commands.add_parser("search", help="find sections")
+    search_parser.add_argument("text", nargs="*", help="words of the course name")
+    search_parser.add_argument("--instructor")
+    search_parser.add_argument("--room")
+    search_parser.add_argument("--mode", help='e.g. "online"')
+    search_parser.add_argument("--days", help="e.g. Tu or MoWe")
+    search_parser.add_argument("--after", help="starts at or after, e.g. 5PM")
+    search_parser.add_argument("--before", help="ends at or before, e.g. 12:00")
+    search_parser.add_argument("--status", help="e.g. open")
+    search_parser.add_argument("--college", help="college code, e.g. HTR01")
+    search_parser.add_argument("--term", help="term code, e.g. 1242")
+    search_parser.add_argument("--subject", help="e.g. CSCI")
+    search_parser.add_argument("--limit", type=int)
+    search_parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        started = time.perf_counter()
+        imported = build(database_file=args.database)
+        logging.info(
+            f"Imported {imported} series in {(time.perf_counter() - started):.2f} s"
+        )
+        return
+
+    started = time.perf_counter()
+    sections = search(
+        " ".join(args.text),
+        args.instructor,
+        args.room,
+        args.mode,
+        args.days,
+        sectionQuery.parse_clock(args.after) if args.after else None,
+        sectionQuery.parse_clock(args.before) if args.before else None,
+        args.status,
+        args.college,
+        args.term,
+        args.subject,
+        args.limit,
+        args.database,
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    for section in sections:
+        if args.json:
+            print(json.dumps(section))
+            continue
+        print(
+            f"{section['college_code']} {section['term']} "
+            f"{section['course_name']} | Class {section['class_number']} "
+            f"{section['section']} | {section['days_times']} | {section['room']} | "
+            f"{section['instructor']} | {section['instruction_mode']} | "
+            f"{section['status']}"
+        )
+    logging.info(f"{len(sections)} sections in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
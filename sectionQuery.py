@@ -0,0 +1,298 @@
+import csv
+import glob
+import json
+import os
+import re
+import numpy as np
+
+CSV_ROOT = os.path.join("collegeCourseData", "csvFiles")
+JSON_ROOT = os.path.join("collegeCourseData", "jsonFiles")
+
+# "<code>_<term>_<subject>_<career>-<timestamp>.csv" (or .json / .jsonl)
+FILE_NAME_PATTERN = re.compile(
+    r"(?P<code>[^_]+)_(?P<term>[^_]+)_(?P<subject>[^_]+)_(?P<career>[^-]+)"
+    r"-(?P<timestamp>[\d-]+)\.(?P<extension>csv|jsonl|json)$"
+)
+
+DAYS = ["Mo", "Tu", "We", "Th", "Fr", "Sa", "Su"]
+TIME_RANGE_PATTERN = re.compile(
+    r"(\d{1,2}):(\d{2})\s*([AP]M)\s*-\s*(\d{1,2}):(\d{2})\s*([AP]M)"
+)
+
+# Text columns are dictionary encoded: an int32 code per row plus the values
+TEXT_COLUMNS = [
+    "college",
+    "college_code",
+    "term",
+    "subject",
+    "course_number",
+    "course_name",
+    "section",
+    "days_times",
+    "room",
+    "instructor",
+    "instruction_mode",
+    "meeting_dates",
+    "status",
+]
+CSV_FIELDS = {
+    "Course Name": "course_name",
+    "Class": "class",
+    "Section": "section",
+    "Days & Times": "days_times",
+    "Room": "room",
+    "Instructor": "instructor",
+    "Instruction Mode": "instruction_mode",
+    "Meeting Dates": "meeting_dates",
+    "Status": "status",
+}
+
+
+def to_minutes(hour, minute, meridiem):
+    return int(hour) % 12 * 60 + int(minute) + (720 if meridiem == "PM" else 0)
+
+
+def parse_clock(text):
+    """
+    Minutes after midnight of "17:30", "5:30PM" or "5PM".
+    """
+    match = re.fullmatch(r"(\d{1,2})(?::(\d{2}))?\s*([AaPp][Mm])?", text.strip())
+    if not match:
+        raise ValueError(f"Not a time of day: {text}")
+    hour, minute, meridiem = match.groups()
+    if meridiem:
+        return to_minutes(hour, minute or 0, meridiem.upper())
+    return int(hour) * 60 + int(minute or 0)
+
+
+def class_number(text):
+    # The class number as an int, or -1 when the int would not give the same
+    # text back (letters, leading zeros)
+    try:
+        number = int(text)
+    except ValueError:
+        return -1
+    return number if number >= 0 and str(number) == text else -1
+
+
+def parse_days_times(days_times):
+    """
+    Parses "TuWeFr 9:30AM - 10:20AM" into (day bitmask, start minute, end
+    minute), with Monday as bit 0. Unknown parts come back as 0 / -1.
+    """
+    day_mask = 0
+    day_text = days_times.split(" ", 1)[0]
+    for index, day in enumerate(DAYS):
+        if day in day_text:
+            day_mask |= 1 << index
+
+    match = TIME_RANGE_PATTERN.search(days_times)
+    if not match:
+        return day_mask, -1, -1
+    return (
+        day_mask,
+        to_minutes(*match.group(1, 2, 3)),
+        to_minutes(*match.group(4, 5, 6)),
+    )
+
+
+def parse_file_name(file_path):
+    match = FILE_NAME_PATTERN.search(os.path.basename(file_path))
+    if not match:
+        raise ValueError(f"Not a course data file name: {file_path}")
+    info = match.groupdict()
+    info["college"] = os.path.basename(os.path.dirname(file_path))
+    return info
+
+
+def latest_snapshot_files(root=CSV_ROOT, extension="csv"):
+    """
+    Returns the newest file for every college/term/subject/career under root.
+    """
+    latest = {}
+    for file_path in glob.glob(os.path.join(root, "*", f"*.{extension}")):
+        try:
+            info = parse_file_name(file_path)
+        except ValueError:
+            continue
+        key = tuple(
+            info[part] for part in ("college", "code", "term", "subject", "career")
+        )
+        if key not in latest or info["timestamp"] > latest[key][0]:
+            latest[key] = (info["timestamp"], file_path)
+    return sorted(file_path for _, file_path in latest.values())
+
+
+def read_rows(file_path):
+    # Yields one flat row dict per section from a CSV or JSON snapshot
+    info = parse_file_name(file_path)
+    base = {
+        "college": info["college"],
+        "college_code": info["code"],
+        "term": info["term"],
+    }
+    if info["extension"] == "csv":
+        with open(file_path, mode="r", encoding="utf-8") as file:
+            for row in csv.DictReader(file):
+                yield dict(base, **{CSV_FIELDS[key]: row[key] for key in CSV_FIELDS})
+    elif info["extension"] == "jsonl":
+        with open(file_path, mode="r", encoding="utf-8") as file:
+            for line in file:
+                yield dict(base, **json.loads(line))
+    else:
+        with open(file_path, mode="r", encoding="utf-8") as file:
+            for course in json.load(file):
+                for class_info in course["classes"]:
+                    yield dict(base, course_name=course["course_name"], **class_info)
+
+
+class SectionTable:
+    """
+    Column-oriented table of sections. Text columns are dictionary encoded,
+    status is normalized to lower case, days/times are parsed once, and a
+    hash index maps (subject, course number) to row positions. Class numbers
+    are ints; the few that are not plain numbers keep their text in
+    `class_texts`.
+    """
+
+    def __init__(self, rows):
+        self.values = {column: [] for column in TEXT_COLUMNS}
+        lookups = {column: {} for column in TEXT_COLUMNS}
+        codes = {column: [] for column in TEXT_COLUMNS}
+        class_numbers, day_masks, starts, ends = [], [], [], []
+        self.class_texts = {}
+
+        for row in rows:
+            parts = row["course_name"].split()
+            row["subject"] = parts[0] if parts else ""
+            row["course_number"] = parts[1] if len(parts) > 1 else ""
+            row["status"] = row["status"].strip().lower()
+            for column in TEXT_COLUMNS:
+                value = row[column]
+                code = lookups[column].get(value)
+                if code is None:
+                    code = lookups[column][value] = len(self.values[column])
+                    self.values[column].append(value)
+                codes[column].append(code)
+
+            number = class_number(row["class"])
+            if number < 0:
+                self.class_texts[len(class_numbers)] = row["class"]
+            class_numbers.append(number)
+            day_mask, start, end = parse_days_times(row["days_times"])
+            day_masks.append(day_mask)
+            starts.append(start)
+            ends.append(end)
+
+        self.lookups = lookups
+        self.codes = {
+            column: np.array(codes[column], dtype=np.int32) for column in TEXT_COLUMNS
+        }
+        self.class_numbers = np.array(class_numbers, dtype=np.int64)
+        self.day_masks = np.array(day_masks, dtype=np.uint8)
+        self.starts = np.array(starts, dtype=np.int16)
+        self.ends = np.array(ends, dtype=np.int16)
+        self.size = len(class_numbers)
+
+        # Hash index: (subject, course number) -> row positions
+        self.index = {}
+        pairs = zip(
+            self.codes["subject"].tolist(), self.codes["course_number"].tolist()
+        )
+        for position, pair in enumerate(pairs):
+            self.index.setdefault(pair, []).append(position)
+        self.index = {
+            pair: np.array(positions, dtype=np.int64)
+            for pair, positions in self.index.items()
+        }
+
+    @classmethod
+    def from_files(cls, file_paths):
+        def all_rows():
+            for file_path in file_paths:
+                yield from read_rows(file_path)
+
+        return cls(all_rows())
+
+    def matching_codes(self, column, predicate):
+        return np.array(
+            [
+                code
+                for code, value in enumerate(self.values[column])
+                if predicate(value)
+            ],
+            dtype=np.int32,
+        )
+
+    def query(
+        self,
+        subject=None,
+        course_number=None,
+        status=None,
+        instructor=None,
+        mode=None,
+        days=None,
+        start_after=None,
+        end_before=None,
+        college_code=None,
+        term=None,
+    ):
+        """
+        Returns the row positions matching every given filter. `instructor`
+        and `mode` are case-insensitive substrings, `days` is e.g. "TuTh"
+        (rows meeting on any of them) and the times are minutes after midnight.
+        """
+        if subject is not None and course_number is not None:
+            pair = (
+                self.lookups["subject"].get(subject, -1),
+                self.lookups["course_number"].get(course_number, -1),
+            )
+            rows = self.index.get(pair, np.empty(0, dtype=np.int64))
+        else:
+            rows = np.arange(self.size)
+            for column, value in (
+                ("subject", subject),
+                ("course_number", course_number),
+            ):
+                if value is not None:
+                    code = self.lookups[column].get(value, -1)
+                    rows = rows[self.codes[column][rows] == code]
+
+        for column, value in (
+            ("status", status.strip().lower() if status else None),
+            ("college_code", college_code),
+            ("term", term),
+        ):
+            if value is not None:
+                code = self.lookups[column].get(value, -1)
+                rows = rows[self.codes[column][rows] == code]
+
+        for column, value in (("instructor", instructor), ("instruction_mode", mode)):
+            if value is not None:
+                needle = value.lower()
+                wanted = self.matching_codes(
+                    column, lambda text: needle in text.lower()
+                )
+                rows = rows[np.isin(self.codes[column][rows], wanted)]
+
+        if days is not None:
+            day_mask, _, _ = parse_days_times(days)
+            rows = rows[(self.day_masks[rows] & day_mask) != 0]
+        if start_after is not None:
+            rows = rows[self.starts[rows] >= start_after]
+        if end_before is not None:
+            rows = rows[(self.ends[rows] >= 0) & (self.ends[rows] <= end_before)]
+
+        return rows
+
+    def row(self, position):
+        row = {
+            column: self.values[column][self.codes[column][position]]
+            for column in TEXT_COLUMNS
+        }
+        number = self.class_numbers[position]
+        row["class"] = self.class_texts[position] if number < 0 else str(number)
+        return row
+
+    def rows(self, positions):
+        return [self.row(position) for position in positions]
@@ -0,0 +1,176 @@
+import argparse
+import datetime
+import glob
+import json
+import logging
+import os
+import courseWriter
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+SNAPSHOT_ROOT = os.path.join("collegeCourseData", "snapshots")
+STATE_FILE = "state.json"
+CHANGES_FILE = "changes.jsonl"
+EVENTS_FILE = "events.jsonl"
+
+
+def snapshot_directory(
+    collegeName, selected_collegeCode, term_selected, subjectName, whichCareer
+):
+    return os.path.join(
+        SNAPSHOT_ROOT,
+        collegeName,
+        f"{selected_collegeCode}_{term_selected}_{subjectName}_{whichCareer}",
+    )
+
+
+def flatten_rows(data):
+    # Key every section by its class number
+    rows = {}
+    for course in data:
+        for class_info in course["classes"]:
+            rows[class_info["class"]] = dict(
+                class_info, course_name=course["course_name"]
+            )
+    return rows
+
+
+def load_state(directory):
+    try:
+        with open(os.path.join(directory, STATE_FILE), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {"updated": None, "rows": {}}
+
+
+def save_state(directory, state):
+    # A unique temp file, so saves from several processes cannot collide
+    with courseWriter.atomic_open(os.path.join(directory, STATE_FILE)) as file:
+        json.dump(state, file)
+
+
+def append_lines(file_name, records):
+    if not records:
+        return
+    with open(file_name, "a", encoding="utf-8") as file:
+        for record in records:
+            file.write(json.dumps(record) + "\n")
+
+
+def diff_rows(previous, current):
+    """
+    Compares two {class number: row} maps and returns (changes, transitions).
+    """
+    changes = []
+    transitions = []
+    for class_number, row in current.items():
+        old_row = previous.get(class_number)
+        if old_row is None:
+            changes.append({"class": class_number, "change": "added", "row": row})
+        elif old_row != row:
+            changes.append({"class": class_number, "change": "changed", "row": row})
+            if old_row["status"] != row["status"]:
+                transitions.append(
+                    {
+                        "class": class_number,
+                        "course_name": row["course_name"],
+                        "from": old_row["status"],
+                        "to": row["status"],
+                    }
+                )
+    for class_number in previous.keys() - current.keys():
+        changes.append({"class": class_number, "change": "removed", "row": None})
+    return changes, transitions
+
+
+def record_snapshot(
+    data,
+    collegeName,
+    selected_collegeCode,
+    term_selected,
+    subjectName,
+    whichCareer,
+    timestamp=None,
+):
+    """
+    Compares a new scrape with the last stored one. Only changed rows are
+    appended to changes.jsonl, and status flips go to events.jsonl. Returns
+    the status transitions.
+    """
+    directory = snapshot_directory(
+        collegeName, selected_collegeCode, term_selected, subjectName, whichCareer
+    )
+    os.makedirs(directory, exist_ok=True)
+    timestamp = timestamp or datetime.datetime.now().isoformat(timespec="seconds")
+
+    state = load_state(directory)
+    current = flatten_rows(data)
+    changes, transitions = diff_rows(state["rows"], current)
+
+    query = {
+        "college": collegeName,
+        "collegeCode": selected_collegeCode,
+        "term": term_selected,
+        "subject": subjectName,
+        "career": whichCareer,
+    }
+    append_lines(
+        os.path.join(directory, CHANGES_FILE),
+        [dict(change, time=timestamp) for change in changes],
+    )
+    # The first snapshot only sets the baseline; nothing has transitioned yet
+    if state["updated"] is None:
+        transitions = []
+    events = [dict(query, time=timestamp, **event) for event in transitions]
+    append_lines(os.path.join(directory, EVENTS_FILE), events)
+
+    if changes or state["updated"] is None:
+        save_state(directory, {"updated": timestamp, "rows": current})
+
+    logging.info(
+        f"Snapshot for {selected_collegeCode} {term_selected} {subjectName} "
+        f"{whichCareer}: {len(changes)} changed rows, {len(events)} status changes"
+    )
+    return events
+
+
+def changes_since(since, collegeName=None, root=None):
+    """
+    Returns every status transition recorded at or after `since` (a datetime
+    or ISO string), oldest first, optionally for one college.
+    """
+    if isinstance(since, datetime.datetime):
+        since = since.isoformat(timespec="seconds")
+    root = root or SNAPSHOT_ROOT
+
+    pattern = os.path.join(root, collegeName or "*", "*", EVENTS_FILE)
+    events = []
+    for file_name in glob.glob(pattern):
+        with open(file_name, "r", encoding="utf-8") as file:
+            for line in file:
+                event = json.loads(line)
+                if event["time"] >= since:
+                    events.append(event)
+    events.sort(key=lambda event: event["time"])
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show section status changes")
+    parser.add_argument("since", help="ISO time, e.g. 2024-01-25T08:00")
+    parser.add_argument("--college", help="college folder name, e.g. HunterCollege")
+    args = parser.parse_args()
+
+    for event in changes_since(args.since, args.college):
+        print(
+            f"{event['time']} {event['collegeCode']} {event['class']} "
+            f"{event['course_name']}: {event['from']} -> {event['to']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+from html import escape
+import argparse
+import csv
+import datetime
+import glob
+import json
+import logging
+import os
+import random
+import courseWriter
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+RECORDED_ROOT = os.path.join("collegeCourseData", "jsonFiles")
+NBSP = "\u00a0"
+
+SUBJECTS = {
+    "CSCI": "Computer Science",
+    "MATH": "Mathematics",
+    "PHYS": "Physics",
+    "SPAN": "Spanish",
+    "LAW": "Law",
+}
+DAY_PATTERNS = ["MoWe", "TuTh", "TuWeFr", "Mo", "Tu", "We", "Th", "Fr", "Sa"]
+START_TIMES = ["8:00AM", "9:30AM", "11:00AM", "12:30PM", "2:00PM", "3:30PM", "6:00PM"]
+END_TIMES = ["9:15AM", "10:45AM", "12:15PM", "1:45PM", "3:15PM", "4:45PM", "8:00PM"]
+MODES = ["In Person", "In Person", "In Person", "Online", "Hybrid"]
+STATUSES = ["Open", "Open", "Closed", "Closed", "Wait List"]
+SECTION_KINDS = ["LEC Regular", "LEC Regular", "LAB Regular", "REC Regular"]
+MEETING_DATES = "01/25/2024 - 05/22/2024"
+
+
+def course_name(subject, number, title):
+    # The site separates the parts with non-breaking spaces
+    return NBSP.join([subject, str(number), "-", *title.split(" ")])
+
+
+def render_results_html(courses, college="Hunter College", subject="Spanish"):
+    """
+    Renders a course list in the layout of the CUNY results page: a
+    .testing_msg heading per course followed by a classinfo table with one
+    tbody per section.
+    """
+    parts = [
+        "<html><head><title>Class Search Results</title>",
+        '<link rel="stylesheet" href="css/search.css"></head><body>',
+        '<div id="contentDivImg_inst0">',
+        f'<div class="testing_msg"><span>{escape(college)}</span></div>',
+        f'<div class="testing_msg"><span>{escape(subject)}</span></div>',
+    ]
+    for index, course in enumerate(courses):
+        parts.append(
+            f'<div class="testing_msg"><span>'
+            f"{escape(course['course_name']).replace(NBSP, '&nbsp;')}</span></div>"
+        )
+        parts.append(
+            f'<table class="classinfo" id="contentDivImg{index}"><thead><tr>'
+            "<th>Class</th><th>Section</th><th>DaysAndTimes</th><th>Room</th>"
+            "<th>Instructor</th><th>Instruction Mode</th><th>Meeting Dates</th>"
+            "<th>Status</th><th>Course Topic</th></tr></thead>"
+        )
+        for class_info in course["classes"]:
+            cells = [
+                f'<a href="#" onclick="return false;">{escape(class_info["class"])}</a>',
+                escape(class_info["section"]),
+                escape(class_info["days_times"]),
+                escape(class_info["room"]),
+                escape(class_info["instructor"]),
+                escape(class_info["instruction_mode"]),
+                escape(class_info["meeting_dates"]),
+                f'<img src="images/{class_info["status"][:1].lower()}.png" '
+                f'title="{escape(class_info["status"])}" '
+                f'alt="{escape(class_info["status"])}">',
+                "&nbsp;",
+            ]
+            parts.append(
+                '<tbody><tr class="classinfo_row">'
+                + "".join(f"<td>{cell}</td>" for cell in cells)
+                + "</tr></tbody>"
+            )
+        parts.append("</table>")
+    parts.append("</div></body></html>")
+    return "\n".join(parts)
+
+
+def anonymize(courses):
+    # Instructor names become stable placeholders; TBA and Staff stay as-is
+    names = {}
+    anonymized = []
+    for course in courses:
+        classes = []
+        for class_info in course["classes"]:
+            instructor = class_info["instructor"]
+            if instructor not in ("TBA", "Staff", ""):
+                instructor = names.setdefault(
+                    instructor, f"Instructor {len(names) + 1:03d}"
+                )
+            classes.append(dict(class_info, instructor=instructor))
+        anonymized.append({"course_name": course["course_name"], "classes": classes})
+    return anonymized
+
+
+def count_sections(courses):
+    return sum(len(course["classes"]) for course in courses)
+
+
+def take_sections(courses, sections):
+    """
+    Repeats the courses until there are exactly `sections` sections. Each
+    repeat gets new class numbers so every section stays unique.
+    """
+    result = []
+    total = 0
+    copy = 0
+    while total < sections:
+        for course in courses:
+            classes = []
+            for class_info in course["classes"]:
+                if total == sections:
+                    break
+                number = class_info["class"]
+                if copy and number.isdigit():
+                    number = str(int(number) + copy * 100000)
+                classes.append(dict(class_info, **{"class": number}))
+                total += 1
+            if classes:
+                result.append(
+                    {"course_name": course["course_name"], "classes": classes}
+                )
+            if total == sections:
+                break
+        copy += 1
+    return result
+
+
+def recorded_courses(sections, root=RECORDED_ROOT):
+    """
+    Anonymized sections from the saved scrapes under root, repeated until
+    there are `sections` of them.
+    """
+    courses = []
+    for file_name in sorted(glob.glob(os.path.join(root, "*", "*.json"))):
+        with open(file_name, "r", encoding="utf-8") as file:
+            courses.extend(json.load(file))
+    if not courses:
+        raise ValueError(f"No recorded scrapes found under {root}")
+    return take_sections(anonymize(courses), sections)
+
+
+def synthetic_courses(sections, seed=0, subjects=None):
+    """
+    Generates `sections` realistic but made-up sections. The same seed always
+    gives the same courses.
+    """
+    generator = random.Random(seed)
+    subjects = subjects or list(SUBJECTS)
+    courses = []
+    class_number = 10000
+    while class_number - 10000 < sections:
+        subject = generator.choice(subjects)
+        number = generator.randrange(100, 500) * 100 + generator.choice([0, 1, 2])
+        title = f"{SUBJECTS.get(subject, subject)} Topics {generator.randrange(1, 9)}"
+        classes = []
+        for section in range(1, generator.randrange(1, 8) + 1):
+            if class_number - 10000 == sections:
+                break
+            slot = generator.randrange(len(START_TIMES))
+            classes.append(
+                {
+                    "class": str(class_number),
+                    "section": f"{section:02d}-{generator.choice(SECTION_KINDS)}",
+                    "days_times": f"{generator.choice(DAY_PATTERNS)} "
+                    f"{START_TIMES[slot]} - {END_TIMES[slot]}",
+                    "room": f"{generator.choice('NWEH')} {generator.randrange(100, 1000)}",
+                    "instructor": generator.choice(
+                        ["TBA", "Staff"]
+                        + [f"Instructor {index:03d}" for index in range(1, 40)]
+                    ),
+                    "instruction_mode": generator.choice(MODES),
+                    "meeting_dates": MEETING_DATES,
+                    "status": generator.choice(STATUSES),
+                }
+            )
+            class_number += 1
+        courses.append(
+            {"course_name": course_name(subject, number, title), "classes": classes}
+        )
+    return courses
+
+
+def write_csv_history(
+    root,
+    sections,
+    snapshots,
+    seed=0,
+    college="SyntheticCollege",
+    code="SYN01",
+    term="1242",
+    subject="CSCI",
+    career="UGRD",
+    flip_rate=0.05,
+):
+    """
+    Writes `snapshots` CSV files of one subject in the csvFiles layout, an
+    hour apart, with a share of the sections flipping status each time.
+    Returns the file names.
+    """
+    generator = random.Random(seed)
+    courses = synthetic_courses(sections, seed, [subject])
+    start = datetime.datetime(2024, 1, 8, 8, 0)
+    file_names = []
+    for snapshot in range(snapshots):
+        if snapshot:
+            for course in courses:
+                for class_info in course["classes"]:
+                    if generator.random() < flip_rate:
+                        class_info["status"] = (
+                            "Open" if class_info["status"] != "Open" else "Closed"
+                        )
+        timestamp = (start + datetime.timedelta(hours=snapshot)).strftime(
+            "%Y%m%d-%H%M%S"
+        )
+        file_name = os.path.join(
+            root, college, f"{code}_{term}_{subject}_{career}-{timestamp}.csv"
+        )
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        with courseWriter.atomic_open(file_name, newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(courseWriter.CSV_HEADER)
+            for record in courseWriter.iter_records(courses):
+                writer.writerow(courseWriter.csv_row(*record))
+        file_names.append(file_name)
+    return file_names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate offline test pages")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    html_parser = commands.add_parser("html", help="write a results page")
+    html_parser.add_argument("output")
+    html_parser.add_argument("--sections", type=int, default=100)
+    html_parser.add_argument(
+        "--kind", choices=["recorded", "synthetic"], default="synthetic"
+    )
+    html_parser.add_argument("--seed", type=int, default=0)
+
+    history_parser = commands.add_parser("history", help="write a CSV history")
+    history_parser.add_argument("root", help="folder to write <College>/*.csv into")
+    history_parser.add_argument("--sections", type=int, default=1000)
+    history_parser.add_argument("--snapshots", type=int, default=24)
+    history_parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "html":
+        if args.kind == "recorded":
+            courses = recorded_courses(args.sections)
+        else:
+            courses = synthetic_courses(args.sections, args.seed)
+        with courseWriter.atomic_open(args.output) as file:
+            file.write(render_results_html(courses))
+        logging.info(f"Wrote {count_sections(courses)} sections to {args.output}")
+    else:
+        file_names = write_csv_history(
+            args.root, args.sections, args.snapshots, args.seed
+        )
+        logging.info(f"Wrote {len(file_names)} CSV snapshots under {args.root}")
+
+
+if __name__ == "__main__":
+    main()
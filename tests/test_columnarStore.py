@@ -0,0 +1,41 @@
+import columnarStore
+
+COURSES = [
+    {
+        "course_name": "SPAN 101 - Elementary Spanish I",
+        "classes": [
+            {
+                "class": class_text,
+                "section": section,
+                "days_times": "MoWe 9:00AM - 10:15AM",
+                "room": "HW 512",
+                "instructor": "Ana Lopez",
+                "instruction_mode": "In Person",
+                "meeting_dates": "08/28/2024 - 12/20/2024",
+                "status": status,
+            }
+            for class_text, section, status in [
+                ("10100", "01-LEC Regular", "Open"),
+                ("01234", "02-LEC Regular", "Closed"),
+                ("12345A", "03-LEC Regular", "Open"),
+                ("70000", "04-LEC Regular", "Open"),
+            ]
+        ],
+    }
+]
+
+
+def test_class_numbers_round_trip_as_their_text(tmp_path):
+    file_name = str(tmp_path / f"snapshot.{columnarStore.EXTENSION}")
+    columnarStore.write_columnar(COURSES, file_name)
+    snapshot = columnarStore.ColumnarSnapshot(file_name)
+
+    expected = [class_info["class"] for class_info in COURSES[0]["classes"]]
+    assert snapshot.column("class") == expected
+    assert snapshot.column("section_number") == [1, 2, 3, 4]
+
+    open_classes, closed_classes = columnarStore.filter_by_course_number(
+        snapshot, "101"
+    )
+    assert [row["class"] for row in open_classes] == ["10100", "12345A", "70000"]
+    assert [row["class"] for row in closed_classes] == ["01234"]
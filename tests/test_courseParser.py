@@ -0,0 +1,40 @@
+import glob
+import os
+import pytest
+import courseParser
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "pages")
+PAGES = sorted(glob.glob(os.path.join(PAGES_DIR, "*.html")))
+
+ROW = (
+    "<tr><td>{number}</td><td>01-LEC Regular</td><td>Mo 9:00AM - 10:15AM</td>"
+    "<td>Main Bldg 101</td><td>TBA</td><td>In Person</td>"
+    '<td>01/25/2024 - 05/22/2024</td><td><img title="Open"></td></tr>'
+)
+
+# A classinfo table whose rows sit directly in the table: html.parser keeps
+# it that way, lexbor wraps the rows in an implicit tbody
+NO_TBODY_PAGE = (
+    "<html><body>"
+    '<div class="testing_msg"><span>LAW 101 - Intro to Law</span></div>'
+    '<table class="classinfo"><tr><th>Class</th><th>Section</th></tr>'
+    + ROW.format(number="12345")
+    + ROW.format(number="12346")
+    + "</table></body></html>"
+)
+
+
+@pytest.mark.parametrize("file_name", PAGES, ids=os.path.basename)
+def test_recorded_pages_parse_the_same_with_every_backend(file_name):
+    with open(file_name, "r", encoding="utf-8") as file:
+        html_content = file.read()
+    assert courseParser.parse_course_results(html_content, "html.parser")
+    assert courseParser.check_parity(html_content) == []
+
+
+def test_table_without_tbody_parses_the_same_with_every_backend():
+    assert courseParser.check_parity(NO_TBODY_PAGE) == []
+    courses = courseParser.parse_course_results(NO_TBODY_PAGE, "html.parser")
+    assert [course["course_name"] for course in courses] == ["LAW 101 - Intro to Law"]
+    assert [row["class"] for row in courses[0]["classes"]] == ["12345", "12346"]
+    assert courses[0]["classes"][0]["status"] == "Open"
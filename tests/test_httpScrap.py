@@ -0,0 +1,62 @@
+import asyncio
+import os
+import pytest
+import courseParser
+import httpScrap
+import mockServer
+
+RECORDED_PAGE = os.path.join(
+    os.path.dirname(__file__), "..", "benchmarks", "pages", "recorded-100.html"
+)
+
+
+@pytest.fixture
+def recorded_server():
+    with open(RECORDED_PAGE, "r", encoding="utf-8") as file:
+        results_html = file.read()
+    server = mockServer.start_server(results_html)
+    yield server, results_html
+    server.shutdown()
+    server.server_close()
+
+
+def test_run_batch_returns_the_courses_of_the_replayed_page(recorded_server):
+    server, results_html = recorded_server
+    targets = [
+        ["HTR01", "1242", "LAW", "UGRD"],
+        ["HTR01", "1242", "SPAN", "UGRD"],
+        ["YRK01", "1242", "PHYS", "GRAD"],
+    ]
+
+    results = asyncio.run(
+        httpScrap.run_batch(
+            targets, concurrency=2, save=False, base_url=mockServer.base_url(server)
+        )
+    )
+
+    expected = courseParser.parse_course_results(results_html)
+    assert expected
+    assert sorted(result["target"] for result in results) == sorted(targets)
+    for result in results:
+        assert result["error"] is None
+        assert result["courses"] == expected
+
+
+@pytest.mark.parametrize("parser", ["selectolax", "lxml", "html.parser"])
+def test_only_form_fields_mark_an_expired_search(parser, monkeypatch):
+    if parser != "selectolax":
+        monkeypatch.setattr(courseParser, "LexborHTMLParser", None)
+    if parser == "html.parser":
+        monkeypatch.setattr(courseParser, "lxml", None)
+    with open(RECORDED_PAGE, "r", encoding="utf-8") as file:
+        results_html = file.read()
+    # Field names in a script or a hidden field do not make results a form
+    mentions = (
+        '<script>var form = "subject_ld term_value";</script>'
+        '<input type="hidden" name="term_value" value="1242">'
+    )
+    results_html = results_html.replace("</body>", mentions + "</body>")
+
+    assert not httpScrap.is_search_form(results_html)
+    assert httpScrap.is_search_form(mockServer.render_college_form())
+    assert httpScrap.is_search_form(mockServer.render_subject_form())
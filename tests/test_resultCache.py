@@ -0,0 +1,75 @@
+import asyncio
+import os
+import time
+import resultCache
+
+
+def test_concurrent_fetches_of_one_page_share_a_single_fetch(tmp_path, monkeypatch):
+    monkeypatch.setattr(resultCache, "shared", resultCache.ResultCache(root=tmp_path))
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ("College", "HTR01", "1242", "LAW", "UGRD"), "<html></html>"
+
+    async def main():
+        first = await asyncio.gather(
+            *(resultCache.cached_fetch("key", fetch) for _ in range(3))
+        )
+        # A new cache finds the page on disk
+        monkeypatch.setattr(
+            resultCache, "shared", resultCache.ResultCache(root=tmp_path)
+        )
+        return first, await resultCache.cached_fetch("key", fetch)
+
+    first, from_disk = asyncio.run(main())
+    assert len(calls) == 1
+    page = first[0][:2]
+    # Only the caller that fetched saves the page
+    assert [cached for _, _, cached in first] == [False, True, True]
+    assert all(result[:2] == page for result in first)
+    assert from_disk == (*page, True)
+
+
+def test_cache_is_off_unless_a_max_age_turns_it_on(monkeypatch):
+    monkeypatch.setattr(resultCache, "shared", None)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return ("College",), "<html></html>"
+
+    async def main():
+        for _ in range(2):
+            await resultCache.cached_fetch("key", fetch)
+        return await resultCache.cached_fetch("key", fetch, max_age=0)
+
+    assert asyncio.run(main())[2] is False
+    assert len(calls) == 3
+    assert resultCache.shared is None
+
+
+def test_open_only_pages_have_their_own_key():
+    user_preferences = {
+        "selected_collegeCode": "HTR01",
+        "term_selected": "1242",
+        "subjectName": "LAW",
+        "whichCareer": "UGRD",
+    }
+    base_url = "http://127.0.0.1:8080/"
+    assert resultCache.cache_key(base_url, user_preferences) != (
+        resultCache.cache_key(base_url, user_preferences, open_only=True)
+    )
+
+
+def test_prune_drops_old_entries_then_the_oldest_over_the_size_limit(tmp_path):
+    cache = resultCache.ResultCache(root=tmp_path, disk_max_age=60, disk_max_bytes=250)
+    now = time.time()
+    for name, age in [("stale", 120), ("old", 30), ("middle", 20), ("new", 10)]:
+        path = tmp_path / f"{name}.json"
+        path.write_text("x" * 100)
+        os.utime(path, (now - age, now - age))
+
+    assert cache.prune(now) == 2
+    assert sorted(os.listdir(tmp_path)) == ["middle.json", "new.json"]
@@ -0,0 +1,94 @@
+import copy
+import os
+import pytest
+import courseDatabase
+import sectionIndex
+import sectionQuery
+import syntheticPages
+
+SERIES = ("Hunter College", "HTR01", "1242", "CSCI", "UGRD")
+
+
+@pytest.fixture
+def database_file(tmp_path):
+    return str(tmp_path / "courses.db")
+
+
+def flat_rows(courses):
+    return [
+        dict(
+            class_info,
+            course_name=course["course_name"],
+            college=SERIES[0],
+            college_code=SERIES[1],
+            term=SERIES[2],
+        )
+        for course in courses
+        for class_info in course["classes"]
+    ]
+
+
+@pytest.mark.parametrize(
+    "days, starts_after, ends_before",
+    [
+        ("Tu", None, None),
+        ("MoWe", None, None),
+        ("TuTh", 17 * 60, None),
+        (None, None, 720),
+    ],
+)
+def test_search_matches_section_query(database_file, days, starts_after, ends_before):
+    courses = syntheticPages.synthetic_courses(300, seed=1, subjects=["CSCI"])
+    courseDatabase.save_courses(courses, *SERIES, database_file=database_file)
+
+    table = sectionQuery.SectionTable(flat_rows(courses))
+    expected = sorted(
+        row["class"]
+        for row in table.rows(
+            table.query(days=days, start_after=starts_after, end_before=ends_before)
+        )
+    )
+    found = sorted(
+        section["class_number"]
+        for section in sectionIndex.search(
+            days=days,
+            starts_after=starts_after,
+            ends_before=ends_before,
+            database_file=database_file,
+        )
+    )
+    assert expected
+    assert found == expected
+
+
+def test_only_changed_sections_are_rewritten(database_file):
+    courses = syntheticPages.synthetic_courses(20, seed=2, subjects=["CSCI"])
+    assert courseDatabase.save_courses(courses, *SERIES, database_file=database_file)
+    assert (
+        courseDatabase.save_courses(courses, *SERIES, database_file=database_file) == 0
+    )
+
+    changed = copy.deepcopy(courses)
+    dropped = changed[0]["classes"].pop()
+    changed[-1]["classes"][0]["instructor"] = "Ada Lovelace"
+    assert (
+        courseDatabase.save_courses(changed, *SERIES, database_file=database_file) == 2
+    )
+
+    found = sectionIndex.search(instructor="lovelace", database_file=database_file)
+    assert [section["class_number"] for section in found] == [
+        changed[-1]["classes"][0]["class"]
+    ]
+    listed = {
+        section["class_number"]
+        for section in sectionIndex.search(database_file=database_file)
+    }
+    assert dropped["class"] not in listed
+
+
+def test_readers_leave_a_missing_database_alone(database_file):
+    assert sectionIndex.search("intro", database_file=database_file) == []
+    assert (
+        courseDatabase.find_sections("CSCI", "101", database_file=database_file) == []
+    )
+    assert not os.path.exists(database_file)